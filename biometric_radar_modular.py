@@ -1,20 +1,30 @@
 from ntrip_manager import NtripManager
 import sys
 from PyQt5.QtWidgets import QMainWindow, QApplication, QWidget, QHBoxLayout
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap
 from pathlib import Path
 import yaml
 
 from staticMap import StaticMap, MapViewController
+from map_loader import MapLoader
+from map_tiles import TileMapLoader
+from map_disk_cache import MapDiskCache
 from sensor_client import SensorClient
+from sensor_descriptor import SensorDescriptor, load_sensor_config
 from sensor_list_widget import SensorListWidget
 from ntrip_client import NtripClient
+from ntrip_caster import NtripCaster
+from gga_uplink import GgaUplinkPolicy
+from rtcm_capture import RtcmCapture, ReplayClient
+from ntrip_sourcetable import MountpointSelector, SourcetableCache
 from config_manager import ConfigManager
 from map_overlay_widget import MapWithOverlay
 from marker_overlay import MarkerOverlay
 
 
 class BiometricRadarApp(QMainWindow):
+    ntrip_state_changed = pyqtSignal(str, str)  # state, detail (NTRIP 수신 스레드에서 emit)
     
     def __init__(self, config_data):
         super().__init__()
@@ -34,25 +44,64 @@ class BiometricRadarApp(QMainWindow):
         self.sensors_ip = config_data.get("sensors_ip", {})
         self.update_interval = config_data.get("map_update_interval", 1000)
         self.ntrip_settings = config_data.get("ntrip_settings", {})
+        self.sensor_event_loop = config_data.get("sensor_event_loop", False)
+        self.history_capacity = config_data.get("history_capacity", 3600)
+        self.rtcm_filter = config_data.get("rtcm_filter")
+        self.map_cache_mb = config_data.get("map_cache_mb", 128)
+        self.map_disk_cache_mb = config_data.get("map_disk_cache_mb", 512)
+        self.map_cache_ttl_days = config_data.get("map_cache_ttl_days", 7)
+        self.map_offline = config_data.get("map_offline", False)
+        self.map_tile_mode = config_data.get("map_tile_mode", False)
+        self.map_tile_size = config_data.get("map_tile_size", 512)
         
         self.initial_map_loaded = False
+        self._state_version = 0
+        self._rtk_active = False
     
     def _setup_window(self):
         self.setWindowTitle("Biometric Radar Map Viewer")
         self.setFixedSize(self.window["width"], self.window["height"])
     
     def _setup_map(self):
-        self.map = StaticMap()
+        disk_cache = None
+        if self.map_disk_cache_mb:
+            # 재시작해도 기본 화면을 바로 띄우고, 현장에서 API가 안 되면 캐시된 화면으로 대체
+            try:
+                disk_cache = MapDiskCache(
+                    max_bytes=self.map_disk_cache_mb * 1024 * 1024,
+                    ttl=self.map_cache_ttl_days * 86400
+                )
+            except Exception as e:
+                print(f"Map disk cache unavailable: {e}")
+        
+        self.map = StaticMap(
+            cache_bytes=self.map_cache_mb * 1024 * 1024,
+            disk_cache=disk_cache,
+            offline=self.map_offline
+        )
         self.map.setLogininfo(self.naver_client["id"], self.naver_client["key"])
         self.map.setSize(self.window["width"] - 300, self.window["height"])
         self.map.setZoom(self.defaults["zoom_level"])
         self.default_center = (self.defaults["center_lng"], self.defaults["center_lat"])
+        
+        # 지도 요청은 작업 스레드에서, 결과는 image_ready 시그널로 UI 스레드에서 반영
+        # 타일 모드는 화면을 고정 격자 타일로 나눠 받아 이동 시 새로 보이는 타일만 요청
+        if self.map_tile_mode:
+            self.map_loader = TileMapLoader(self.map, tile_size=self.map_tile_size, parent=self)
+        else:
+            self.map_loader = MapLoader(self.map, parent=self)
+        self.map_loader.image_ready.connect(self._on_map_image)
 
     def _setup_sensor_client(self):
-        self.sensor_client = SensorClient()
+        self.sensor_client = SensorClient(
+            use_event_loop=self.sensor_event_loop,
+            history_capacity=self.history_capacity,
+            rtcm_filter=self.rtcm_filter
+        )
         
-        for ip, channel in self.sensors_ip.items():
-            self.sensor_client.add_sensor(ip, channel)
+        # sensors_ip 값은 채널 문자열 또는 {channel, host, power_port, gps_port, transport, rtcm}
+        for ip, channel, descriptor in load_sensor_config(self.sensors_ip):
+            self.sensor_client.add_sensor(ip, channel, descriptor)
             self.sensor_list.add_sensor(ip, channel)
     
     def _setup_ui(self):
@@ -84,28 +133,90 @@ class BiometricRadarApp(QMainWindow):
 
     def _setup_ntrip(self):
         try:
-            ntrip_client = NtripClient(
-                self.ntrip_settings["host_address"],
-                self.ntrip_settings["host_port"],
-                self.ntrip_settings["user_id"],
-                self.ntrip_settings["user_pw"],
-                self.ntrip_settings["mount_point"]
+            replay_file = self.ntrip_settings.get("replay_file")
+            if replay_file:
+                # 캐스터 대신 저장해 둔 RTCM 캡처를 재생 (오프라인 시험용)
+                ntrip_client = ReplayClient(replay_file, speed=self.ntrip_settings.get("replay_speed", 1.0), loop=True)
+            else:
+                ntrip_client = NtripClient(
+                    self.ntrip_settings["host_address"],
+                    self.ntrip_settings["host_port"],
+                    self.ntrip_settings["user_id"],
+                    self.ntrip_settings["user_pw"],
+                    self.ntrip_settings["mount_point"],
+                    ntrip_version=self.ntrip_settings.get("ntrip_version", 2)
+                )
+
+            capture = None
+            if self.ntrip_settings.get("rtcm_capture"):
+                capture = RtcmCapture(self.ntrip_settings["rtcm_capture"])
+
+            mountpoint_selector = None
+            if self.ntrip_settings.get("auto_mountpoint", False):
+                # 소스테이블에서 기본 위치에 가장 알맞은 마운트포인트 선택, 이후 센서 위치로 재선택
+                mountpoint_selector = MountpointSelector(
+                    ntrip_client,
+                    SourcetableCache(ttl=self.ntrip_settings.get("sourcetable_ttl", 86400)),
+                    reselect_distance=self.ntrip_settings.get("reselect_distance", 5000.0)
+                )
+
+            self.ntrip_caster = None
+            if self.ntrip_settings.get("local_caster", False):
+                # 같은 보정정보를 다른 로컬 클라이언트/로버에도 중계 (업스트림 연결은 하나)
+                # 기본은 이 PC에서만 접속 가능, 다른 장비에 열 때는 local_caster_users로 인증을 둔다
+                caster_host = self.ntrip_settings.get("local_caster_host", "127.0.0.1")
+                caster_users = self.ntrip_settings.get("local_caster_users") or None
+                caster = NtripCaster(
+                    host=caster_host,
+                    port=self.ntrip_settings.get("local_caster_port", 2101),
+                    mountpoint=self.ntrip_settings.get("local_caster_mount", "LOCAL"),
+                    users={str(u): str(pw) for u, pw in caster_users.items()} if caster_users else None,
+                    position=(self.defaults["center_lat"], self.defaults["center_lng"])
+                )
+                try:
+                    caster.start()
+                    self.ntrip_caster = caster
+                except OSError as e:
+                    print(f"Local NTRIP caster start failed: {e}")
+
+            # 센서 중 대표 위치를 골라 gga_upload_interval마다 또는 크게 이동했을 때만 업로드
+            gga_policy = GgaUplinkPolicy(
+                self.sensor_client,
+                mode=self.ntrip_settings.get("gga_uplink", "best"),
+                interval=self.ntrip_settings.get("gga_upload_interval", 10.0),
+                distance=self.ntrip_settings.get("gga_upload_distance", 500.0)
             )
 
-            if ntrip_client.connect():
-                self.ntrip_manager = NtripManager(ntrip_client, self.sensor_client)
-                self.ntrip_manager.start()
-                self.overlay.set_rtk_status(True)
-            else:
-                print("NTRIP connection failed, continuing without RTK")
-                self.ntrip_manager = None
-                self.overlay.set_rtk_status(False)
+            # 연결/인증/첫 데이터 대기, 소스테이블 조회는 매니저 스레드에서 진행하고
+            # 상태 변화는 시그널로 받아 UI 스레드에서 표시
+            self.ntrip_manager = NtripManager(
+                ntrip_client,
+                self.sensor_client,
+                streaming=self.ntrip_settings.get("streaming", True),
+                gga_interval=self.ntrip_settings.get("gga_interval", 1.0),
+                rtcm_framing=self.ntrip_settings.get("rtcm_framing", True),
+                data_timeout=self.ntrip_settings.get("data_timeout", 10.0),
+                mountpoint_selector=mountpoint_selector,
+                caster=self.ntrip_caster,
+                start_position=(self.defaults["center_lat"], self.defaults["center_lng"]),
+                gga_policy=gga_policy,
+                capture=capture
+            )
+            self.ntrip_state_changed.connect(self._on_ntrip_state_changed)
+            self.ntrip_manager.on_state_change = lambda state, detail: self.ntrip_state_changed.emit(state, detail or "")
+            self.ntrip_manager.start()
+            self.overlay.set_rtk_status(False, state=self.ntrip_manager.state)
                 
         except Exception as e:
             print(f"NTRIP setup error: {e}, continuing without RTK")
             self.ntrip_manager = None
             self.overlay.set_rtk_status(False)
 
+    def _on_ntrip_state_changed(self, state, detail):
+        if not self.ntrip_manager:
+            return
+        self.overlay.set_rtk_status(self._rtk_active, self.ntrip_manager.correction_age(), state)
+
     def _start_application(self):
         if not self.sensors_ip:
             print("No sensors configured. Loading map with default center...")
@@ -129,11 +240,15 @@ class BiometricRadarApp(QMainWindow):
         self.marker_timer.start(self.update_interval)
     
     def _check_for_initial_gps(self):
-        if self.sensor_client.gps_data and not self.initial_map_loaded:
+        if self.initial_map_loaded:
+            return
+        
+        _, records = self.sensor_client.state.snapshot()
+        positions = [record.position for record in records.values() if record.position]
+        
+        if positions:
             # 첫 번째 GPS 좌표 가져오기
-            first_ip = list(self.sensor_client.gps_data.keys())[0]
-            first_gps = self.sensor_client.gps_data[first_ip]
-            lng, lat = first_gps
+            lng, lat = positions[0]
             
             print(f"First GPS received: ({lng:.6f}, {lat:.6f})")
             print("Loading map centered at first sensor location...")
@@ -173,7 +288,11 @@ class BiometricRadarApp(QMainWindow):
         self.update_map()
     
     def update_map(self):
-        pixmap = self.map.getMapImage()
+        """현재 화면의 지도 요청 (연속 호출은 마지막 화면 하나로 합쳐짐)"""
+        self.map_loader.request()
+    
+    def _on_map_image(self, params, image):
+        pixmap = QPixmap.fromImage(image)
         self.map_label.setPixmap(pixmap)
         
         if hasattr(self, 'overlay'):
@@ -197,47 +316,53 @@ class BiometricRadarApp(QMainWindow):
                 img_height
             )
 
-        center = self.map.getCenter().split(',')
+        # 마커는 현재 설정이 아니라 이 이미지를 요청할 때의 화면 기준으로 배치
+        center = params["center"].split(',')
         self.marker_overlay.set_map_params(
             float(center[0]),
             float(center[1]),
-            self.map.getZoom(),
-            self.map.params["w"],
-            self.map.params["h"]
+            params["level"],
+            params["w"],
+            params["h"]
         )
         
         self.update_markers()
     
     def update_markers(self):
         """마커만 업데이트"""
+        _, records = self.sensor_client.state.snapshot()
+        
         self.marker_overlay.update_markers(
-            sensors=self.sensor_client.sensors,
-            gps_data=self.sensor_client.gps_data,
-            power_status=self.sensor_client.power_status
+            sensors={ip: record.channel for ip, record in records.items()},
+            gps_data={ip: record.position for ip, record in records.items() if record.position},
+            power_status={ip: record.power for ip, record in records.items()}
         )
     
     def update_ui(self):
-        """센서 리스트, 마커 업데이트"""
-        for ip in self.sensor_client.sensors.keys():
-            power_status = self.sensor_client.power_status.get(ip)
-            self.sensor_list.update_power_status(ip, power_status)
+        """마지막 갱신 이후 바뀐 센서만 리스트, 마커에 반영"""
+        version, changed, removed = self.sensor_client.state.changed_since(self._state_version)
+        self._state_version = version
+        
+        for ip, record in changed.items():
+            self.sensor_list.update_power_status(ip, record.power)
             
-            gps = self.sensor_client.gps_data.get(ip)
-            if gps:
-                lng, lat = gps
+            if record.position:
+                lng, lat = record.position
                 self.sensor_list.update_gps(ip, lng, lat)
         
         # RTK 상태 확인
-        rtk_active = False
-        for ip in self.sensor_client.sensors.keys():
-            rtk_status = self.sensor_client.rtk_status.get(ip)
-            if rtk_status in ['fixed', 'float']:
-                rtk_active = True
-                break
+        _, records = self.sensor_client.state.snapshot()
+        self._rtk_active = any(record.rtk in ('fixed', 'float') for record in records.values())
         
-        self.overlay.set_rtk_status(rtk_active)
+        correction_age = None
+        ntrip_state = None
+        if getattr(self, 'ntrip_manager', None):
+            correction_age = self.ntrip_manager.correction_age()
+            ntrip_state = self.ntrip_manager.state
         
-        self.update_markers()
+        self.overlay.set_rtk_status(self._rtk_active, correction_age, ntrip_state)
+        
+        self.marker_overlay.update_records(changed, removed)
     
     def _on_sensor_add_requested(self, ip, name):
         """오버레이에서 센서 추가 요청 시"""
@@ -247,6 +372,12 @@ class BiometricRadarApp(QMainWindow):
             print(f"Sensor {ip} already exists!")
             return
         
+        try:
+            descriptor = SensorDescriptor.parse(ip, SensorClient.POWER_PORT, SensorClient.GPS_PORT)
+        except ValueError as e:
+            print(f"Invalid sensor address ({ip}): {e}")
+            return
+        
         if not name:
             max_channel = 0
             for ch in self.sensor_client.sensors.values():
@@ -262,29 +393,13 @@ class BiometricRadarApp(QMainWindow):
         
 
         # 센서 클라이언트에 추가
-        self.sensor_client.add_sensor(ip, name)
+        self.sensor_client.add_sensor(ip, name, descriptor)
 
         # UI에 추가
         self.sensor_list.add_sensor(ip, name)
         
         # 센서 연결
-        import threading
-        power_thread = threading.Thread(
-            target=self.sensor_client._connect_power_socket,
-            args=(ip, name),
-            daemon=True
-        )
-        gps_thread = threading.Thread(
-            target=self.sensor_client._connect_gps_socket,
-            args=(ip, name),
-            daemon=True
-        )
-        
-        power_thread.start()
-        gps_thread.start()
-        
-        self.sensor_client.threads.append(power_thread)
-        self.sensor_client.threads.append(gps_thread)
+        self.sensor_client.connect_sensor(ip, name)
     
     def _on_sensor_deleted(self, ip):
         print(f"Deleting sensor: {ip}")
@@ -347,7 +462,12 @@ class BiometricRadarApp(QMainWindow):
         if hasattr(self, 'ntrip_manager') and self.ntrip_manager:
             self.ntrip_manager.stop()
         
+        if getattr(self, 'ntrip_caster', None):
+            self.ntrip_caster.stop()
+        
         self.sensor_client.stop()
+        self.map_loader.close()
+        self.map.close()
         
         event.accept()
 
@@ -377,6 +497,20 @@ def main():
     config_data['default_layout'] = file_config.get('default_layout', {})
     config_data['window_settings'] = file_config.get('window_settings', {})
     config_data['map_update_interval'] = file_config.get('map_update_interval', 1000)
+    config_data['sensor_event_loop'] = file_config.get('sensor_event_loop', False)
+    config_data['history_capacity'] = file_config.get('history_capacity', 3600)
+    config_data['rtcm_filter'] = file_config.get('rtcm_filter')
+    config_data['map_cache_mb'] = file_config.get('map_cache_mb', 128)
+    config_data['map_disk_cache_mb'] = file_config.get('map_disk_cache_mb', 512)
+    config_data['map_cache_ttl_days'] = file_config.get('map_cache_ttl_days', 7)
+    config_data['map_offline'] = file_config.get('map_offline', False)
+    config_data['map_tile_mode'] = file_config.get('map_tile_mode', False)
+    config_data['map_tile_size'] = file_config.get('map_tile_size', 512)
+    
+    # 설정 창에 없는 NTRIP 항목(streaming, auto_mountpoint 등)은 파일 값을 사용
+    ntrip_settings = dict(file_config.get('ntrip_settings') or {})
+    ntrip_settings.update(config_data.get('ntrip_settings') or {})
+    config_data['ntrip_settings'] = ntrip_settings
     
     window = BiometricRadarApp(config_data)
     window.show()
@@ -8,6 +8,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 from delete_list_widget import DeleteListWidget
+from sensor_descriptor import SensorDescriptor
 
 
 class ConfigManager(QDialog):
@@ -154,15 +155,23 @@ class ConfigManager(QDialog):
         self.list_ip.returnPressed.connect(self.add_sensor)
 
     def add_sensor(self):
-        """센서 IP를 리스트에 추가"""
+        """센서 IP(또는 host:power_port:gps_port)를 리스트에 추가"""
         ip = self.list_ip.text().strip()
         if not ip:
             return
 
+        try:
+            SensorDescriptor.parse(ip)
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid sensor", f"{ip}\n{e}")
+            return
+
         self.list_widget.add_item(ip)
         self.list_ip.clear()
 
     def get_current_data(self):
+        # 기존 설정의 디스크립터(dict) 항목은 포트/전송 방식을 유지하고 채널만 다시 매김
+        previous = (self.config_data or {}).get('sensors_ip') or {}
         sensors = {}
         for i in range(self.list_widget.count()):
             item = self.list_widget.listWidget.item(i)
@@ -171,7 +180,11 @@ class ConfigManager(QDialog):
             if label:
                 ip = label.text().strip()
                 ch = f"ch{i+1}"
-                sensors[ip] = ch
+                entry = previous.get(ip)
+                if isinstance(entry, dict):
+                    sensors[ip] = dict(entry, channel=ch)
+                else:
+                    sensors[ip] = ch
 
         data = {
             'naver_client': {
@@ -198,7 +211,10 @@ class ConfigManager(QDialog):
             current_data = self.get_current_data()
             
             self.config_data['naver_client'] = current_data['naver_client']
-            self.config_data['ntrip_settings'] = current_data['ntrip_settings']
+            # 화면에 없는 NTRIP 설정(streaming, gga_interval 등)은 유지
+            ntrip_settings = dict(self.config_data.get('ntrip_settings') or {})
+            ntrip_settings.update(current_data['ntrip_settings'])
+            self.config_data['ntrip_settings'] = ntrip_settings
             self.config_data['sensors_ip'] = current_data['sensors_ip']
 
             config_dir = os.path.dirname(self.config_path)
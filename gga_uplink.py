@@ -0,0 +1,164 @@
+import time
+
+from nmea_parser import nmea_checksum, verify_checksum
+from ntrip_sourcetable import haversine_m
+
+
+MODES = ("best", "nearest", "centroid", "last")
+
+# RTK fixed > float > DGPS > GPS 순으로 선호
+_QUALITY_RANK = {4: 0, 5: 1, 2: 2, 1: 3}
+
+
+def _nmea_coord(value, width, positive, negative):
+    hemisphere = positive if value >= 0 else negative
+    value = abs(value)
+    degrees = int(value)
+    minutes = (value - degrees) * 60
+    # 반올림으로 60.00000분이 되는 경우 방지
+    if minutes >= 59.999995:
+        degrees += 1
+        minutes = 0.0
+    return f"{degrees:0{width}d}{minutes:08.5f}", hemisphere
+
+
+def build_gga(lat, lng, alt=0.0, quality=1, sats=12, hdop=1.0, utc=None, talker="GP"):
+    """위치로 체크섬이 포함된 GGA 문장을 만든다 (utc: 자정 기준 초, None이면 현재 시각)"""
+    if lat is None or lng is None or not -90.0 <= lat <= 90.0 or not -180.0 <= lng <= 180.0:
+        raise ValueError(f"invalid position: {lat}, {lng}")
+    
+    if utc is None:
+        utc = time.time() % 86400
+    utc = round(utc, 2) % 86400
+    hours = int(utc // 3600)
+    minutes = int(utc // 60) % 60
+    seconds = utc % 60
+    
+    lat_text, lat_hemi = _nmea_coord(lat, 2, "N", "S")
+    lng_text, lng_hemi = _nmea_coord(lng, 3, "E", "W")
+    body = (f"{talker}GGA,{hours:02d}{minutes:02d}{seconds:05.2f},"
+            f"{lat_text},{lat_hemi},{lng_text},{lng_hemi},{quality:d},{sats:02d},"
+            f"{hdop:.1f},{alt if alt is not None else 0.0:.1f},M,0.0,M,,")
+    sentence = f"${body}*{nmea_checksum(body.encode('ascii')):02X}"
+    
+    if not verify_checksum(sentence):
+        raise ValueError(f"generated GGA failed checksum: {sentence}")
+    return sentence
+
+
+class GgaUplinkPolicy:
+    """NTRIP 캐스터로 올릴 GGA를 고르고 업로드 빈도를 제한하는 정책
+    
+    mode:
+      best     - 품질(RTK fixed > float > DGPS > GPS)과 HDOP가 가장 좋은 센서의 위치
+      nearest  - 위치가 있는 센서 평균에 가장 가까운 센서의 위치
+      centroid - 위치가 있는 센서 평균 위치로 만든 GGA
+      last     - 기존처럼 sensor_client.nmea_message를 그대로 사용
+    최근 max_age초 안에 갱신된 측위만 쓰고, 업로드는 interval초마다 또는 마지막으로
+    올린 위치에서 distance(m) 이상 벗어났을 때만 한다.
+    """
+    
+    def __init__(self, sensor_client, mode="best", interval=10.0, distance=500.0, max_age=30.0):
+        if mode not in MODES:
+            raise ValueError(f"unsupported GGA uplink mode: {mode}")
+        self.sensor_client = sensor_client
+        self.mode = mode
+        self.interval = interval
+        self.distance = distance
+        self.max_age = max_age
+        
+        self.last_sent_at = None
+        self.last_position = None  # 마지막으로 올린 (lat, lng)
+        self.last_source = None    # 센서 ip 또는 "centroid"
+        self.sent = 0
+        self.skipped = 0
+    
+    def reset(self):
+        """재연결 후 바로 다시 올리도록 업로드 기록을 지운다"""
+        self.last_sent_at = None
+        self.last_position = None
+    
+    def next_gga(self, now=None, force=False):
+        """지금 올려야 할 GGA 문장, 올릴 필요가 없거나 쓸 위치가 없으면 None"""
+        if now is None:
+            now = time.monotonic()
+        
+        if self.mode == "last":
+            candidate = self._last_message()
+        else:
+            candidate = self._select()
+        if candidate is None:
+            return None
+        
+        sentence, position, source = candidate
+        if not force and not self._due(now, position):
+            self.skipped += 1
+            return None
+        
+        self.last_sent_at = now
+        self.last_position = position
+        self.last_source = source
+        self.sent += 1
+        return sentence
+    
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "last_source": self.last_source,
+            "last_position": self.last_position,
+        }
+    
+    def _due(self, now, position):
+        if self.last_sent_at is None or now - self.last_sent_at >= self.interval:
+            return True
+        if position is None or self.last_position is None:
+            return False
+        return haversine_m(self.last_position[0], self.last_position[1], *position) >= self.distance
+    
+    def _last_message(self):
+        message = self.sensor_client.nmea_message
+        if not message or message[3:6] != "GGA" or not verify_checksum(message):
+            return None
+        return message, None, "last"
+    
+    def _fixes(self):
+        """최근 측위가 있는 센서 목록 [(ip, NmeaFix)]"""
+        _, records = self.sensor_client.state.snapshot()
+        oldest = time.time() - self.max_age
+        fixes = []
+        for ip, record in records.items():
+            fix = record.fix
+            # 전원 패킷도 updated_at을 갱신하므로 측위 자체를 받은 시각으로 판단
+            if fix is None or fix.lat is None or not fix.quality or (record.fix_at or 0) < oldest:
+                continue
+            fixes.append((ip, fix))
+        return fixes
+    
+    def _select(self):
+        fixes = self._fixes()
+        if not fixes:
+            return None
+        
+        lat = sum(fix.lat for _, fix in fixes) / len(fixes)
+        lng = sum(fix.lng for _, fix in fixes) / len(fixes)
+        
+        if self.mode == "centroid":
+            alt = [fix.alt for _, fix in fixes if fix.alt is not None]
+            alt = sum(alt) / len(alt) if alt else 0.0
+            return build_gga(lat, lng, alt), (lat, lng), "centroid"
+        
+        if self.mode == "nearest":
+            ip, fix = min(fixes, key=lambda item: haversine_m(item[1].lat, item[1].lng, lat, lng))
+        else:
+            ip, fix = min(fixes, key=lambda item: (
+                _QUALITY_RANK.get(item[1].quality, 9),
+                item[1].hdop if item[1].hdop is not None else 99.9
+            ))
+        
+        sentence = build_gga(
+            fix.lat, fix.lng, fix.alt, quality=fix.quality, sats=min(fix.sats or 0, 99),
+            hdop=fix.hdop if fix.hdop is not None else 1.0, utc=fix.time
+        )
+        return sentence, (fix.lat, fix.lng), ip
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+from sensor_client import SensorClient
+from sensor_simulator import SensorSimulator
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _rss_bytes():
+    """현재 RSS (Linux는 /proc, 그 외는 최대 RSS로 대체, 둘 다 없으면 None)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    
+    try:
+        import resource  # Windows에는 없음
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class _LatencyProbe:
+    """상태 저장소 갱신 시점과 GGA 시각(시뮬레이터 송신 시각)의 차이를 기록"""
+    
+    def __init__(self, limit=200000):
+        self.limit = limit
+        self.samples = []
+        self.recording = False
+        self.updates = 0
+    
+    def __call__(self, ip, record):
+        if not self.recording or record is None or record.fix is None or record.fix.time is None:
+            return
+        self.updates += 1
+        if len(self.samples) < self.limit:
+            now = time.time() % 86400
+            latency = (now - record.fix.time) % 86400
+            self.samples.append(latency)
+
+
+class _SimulatorProcesses:
+    """시뮬레이터를 별도 프로세스로 실행 (클라이언트 CPU 측정에 섞이지 않도록)
+    
+    single_host=True면 host 하나에서 센서마다 포트 2개씩 쓰고,
+    클라이언트는 "host:power_port:gps_port" 디스크립터로 접속한다.
+    """
+    
+    def __init__(self, count, rate, power_port, gps_port, shard_size, host, single_host=False):
+        self.processes = []
+        self.sensors = []  # 클라이언트에 add_sensor할 키
+        
+        for offset in range(0, count, shard_size):
+            shard = min(shard_size, count - offset)
+            if single_host:
+                base = (power_port + offset * 2, gps_port + offset * 2)
+                self.sensors.extend(
+                    f"{host}:{base[0] + i * 2}:{base[1] + i * 2}" for i in range(shard)
+                )
+                placement = ["--host", host, "--port-step", "2"]
+            else:
+                base = (power_port, gps_port)
+                self.sensors.extend(SensorSimulator._alias(host, offset + i) for i in range(shard))
+                placement = ["--aliases", "--host", SensorSimulator._alias(host, offset)]
+            
+            proc = subprocess.Popen(
+                [sys.executable, os.path.join(BASE_DIR, "sensor_simulator.py"),
+                 "--count", str(shard), *placement,
+                 "--power-port", str(base[0]), "--gps-port", str(base[1]),
+                 "--rate", str(rate), "--time-decimals", "3", "--quiet",
+                 "--stats-interval", "3600"],
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+            )
+            self.processes.append(proc)
+        
+        for proc in self.processes:
+            line = proc.stdout.readline()
+            if not line.startswith("Simulator ready"):
+                self.stop()
+                raise RuntimeError(f"simulator failed to start: {line.strip()}")
+    
+    def stop(self):
+        for proc in self.processes:
+            proc.terminate()
+        for proc in self.processes:
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def run_case(count, mode, rate, duration, warmup, power_port, gps_port, shard_size, host,
+             single_host=False):
+    simulators = _SimulatorProcesses(
+        count, rate, power_port, gps_port, shard_size, host, single_host
+    )
+    
+    class BenchmarkClient(SensorClient):
+        POWER_PORT = power_port
+        GPS_PORT = gps_port
+    
+    # 콘솔 출력이 측정에 섞이지 않도록 클라이언트 로그는 버림
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    
+    client = BenchmarkClient(use_event_loop=(mode == "loop"))
+    probe = _LatencyProbe()
+    client.state.subscribe(probe)
+    
+    try:
+        for i, ip in enumerate(simulators.sensors):
+            client.add_sensor(ip, f"ch{i + 1}")
+        client.start()
+        
+        time.sleep(warmup)
+        
+        parsed_before = sum(p.parsed for p in list(client.nmea_parsers.values()))
+        rss_before = _rss_bytes()
+        cpu_before = time.process_time()
+        wall_before = time.perf_counter()
+        probe.recording = True
+        
+        max_threads = threading.active_count()
+        deadline = wall_before + duration
+        while time.perf_counter() < deadline:
+            time.sleep(0.2)
+            max_threads = max(max_threads, threading.active_count())
+        
+        probe.recording = False
+        wall = time.perf_counter() - wall_before
+        cpu = time.process_time() - cpu_before
+        rss_after = _rss_bytes()
+        parsed = sum(p.parsed for p in list(client.nmea_parsers.values())) - parsed_before
+        connected = len(client.gps_sockets)
+    finally:
+        client.stop()
+        simulators.stop()
+        sys.stdout.close()
+        sys.stdout = stdout
+    
+    latencies = sorted(probe.samples)
+    expected = count * rate * 2 * wall  # GGA + RMC
+    
+    return {
+        "sensors": count,
+        "mode": mode,
+        "rate_hz": rate,
+        "duration_s": round(wall, 3),
+        "connected_gps": connected,
+        "sentences_per_s": round(parsed / wall, 1),
+        "expected_sentences_per_s": round(expected / wall, 1),
+        "delivery_ratio": round(parsed / expected, 4) if expected else None,
+        "cpu_percent": round(100 * cpu / wall, 1),
+        "cpu_ms_per_sensor_s": round(1000 * cpu / wall / count, 3),
+        "max_threads": max_threads,
+        "rss_before_mb": round(rss_before / 2 ** 20, 2) if rss_before is not None else None,
+        "rss_growth_mb": round((rss_after - rss_before) / 2 ** 20, 2) if rss_before is not None else None,
+        "latency_samples": len(latencies),
+        "latency_ms": {
+            f"p{q}": round(1000 * _percentile(latencies, q), 2) if latencies else None
+            for q in (50, 90, 99, 99.9)
+        },
+    }
+
+
+def compare(results, baseline_path):
+    """이전 결과 파일과 같은 (sensors, mode) 항목끼리 비교 출력"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    
+    previous = {(r["sensors"], r["mode"]): r for r in baseline.get("results", [])}
+    print(f"\n=== compared with {baseline_path} ({baseline.get('revision')}) ===")
+    for result in results:
+        old = previous.get((result["sensors"], result["mode"]))
+        if old is None:
+            continue
+        print(f"{result['mode']:>6} {result['sensors']:>5} sensors: "
+              f"sentences/s {old['sentences_per_s']} -> {result['sentences_per_s']}, "
+              f"cpu% {old['cpu_percent']} -> {result['cpu_percent']}, "
+              f"p99 ms {old['latency_ms']['p99']} -> {result['latency_ms']['p99']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SensorClient ingest throughput/latency benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--modes", nargs="+", choices=["loop", "thread"], default=["loop", "thread"])
+    parser.add_argument("--rate", type=float, default=10.0, help="GGA/RMC rate per sensor (Hz)")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--host", default="127.0.1.1", help="first loopback alias for simulated sensors")
+    parser.add_argument("--single-host", action="store_true",
+                        help="run all sensors on --host with per-sensor ports instead of loopback aliases")
+    parser.add_argument("--power-port", type=int, default=20023)
+    parser.add_argument("--gps-port", type=int, default=20024)
+    parser.add_argument("--shard-size", type=int, default=250, help="sensors per simulator process")
+    parser.add_argument("--output", default=None, help="write JSON results to this file")
+    parser.add_argument("--compare", default=None, help="previous JSON results to compare against")
+    args = parser.parse_args(argv)
+    
+    results = []
+    for count in args.counts:
+        for mode in args.modes:
+            print(f"Running {mode} mode with {count} sensors...", flush=True)
+            result = run_case(
+                count, mode, args.rate, args.duration, args.warmup,
+                args.power_port, args.gps_port, args.shard_size, args.host, args.single_host
+            )
+            print(json.dumps(result), flush=True)
+            results.append(result)
+    
+    report = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": vars(args),
+        "results": results,
+    }
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from map_tiles import lnglat_to_pixel
+
+
+CACHE_DIR = Path(__file__).resolve().parent / "cache"
+
+
+def _view(params):
+    """params에서 (lng, lat, level, w, h, maptype, markers) 추출"""
+    lng, lat = map(float, str(params["center"]).split(","))
+    markers = "\n".join(params.get("markers") or ())
+    return (lng, lat, int(params.get("level", 10)), int(params.get("w", 0)), int(params.get("h", 0)),
+            params.get("maptype", "basic"), markers)
+
+
+class MapDiskCache:
+    """지도 이미지를 SQLite 파일에 보관하는 영구 캐시 (재시작/오프라인용)
+    
+    키는 MapImageCache와 같은 방식으로 중심을 1픽셀 단위로 맞춘 화면이다.
+    전체 크기가 max_bytes를 넘으면 가장 오래 안 쓴 이미지부터 지우고,
+    받은 지 ttl초가 지난 이미지는 stale로 표시해 다시 받아 보도록 한다.
+    여러 작업 스레드에서 쓰므로 연결 하나를 lock으로 보호한다.
+    """
+    
+    def __init__(self, path=None, max_bytes=512 * 1024 * 1024, ttl=7 * 86400.0):
+        self.path = Path(path) if path else CACHE_DIR / "map_cache.sqlite"
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                key TEXT PRIMARY KEY,
+                lng REAL, lat REAL, level INTEGER, w INTEGER, h INTEGER,
+                maptype TEXT, markers TEXT,
+                data BLOB, size INTEGER, etag TEXT,
+                fetched_at REAL, accessed_at REAL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS images_view ON images (w, h, maptype, level)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS images_accessed ON images (accessed_at)")
+        self.db.commit()
+        self.bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+    
+    @staticmethod
+    def key(params):
+        lng, lat, level, w, h, maptype, markers = _view(params)
+        x, y = lnglat_to_pixel(lng, lat, level)
+        return f"{round(x)}|{round(y)}|{level}|{w}|{h}|{maptype}|{markers}"
+    
+    def get(self, params):
+        """(이미지 바이트, ttl 안인지 여부, etag), 없으면 None"""
+        key = self.key(params)
+        now = time.time()
+        with self._lock:
+            row = self.db.execute(
+                "SELECT data, fetched_at, etag FROM images WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE images SET accessed_at = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            
+            fresh = now - row[1] < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return row[0], fresh, row[2]
+    
+    def has(self, params):
+        """저장되어 있는지만 확인 (통계/접근 시각은 그대로)"""
+        with self._lock:
+            return self.db.execute(
+                "SELECT 1 FROM images WHERE key = ?", (self.key(params),)
+            ).fetchone() is not None
+    
+    def put(self, params, data, etag=None):
+        if len(data) > self.max_bytes:
+            return
+        
+        key = self.key(params)
+        lng, lat, level, w, h, maptype, markers = _view(params)
+        now = time.time()
+        with self._lock:
+            old = self.db.execute("SELECT size FROM images WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, lng, lat, level, w, h, maptype, markers, sqlite3.Binary(data), len(data), etag, now, now)
+            )
+            self.bytes += len(data) - (old[0] if old else 0)
+            self._evict()
+            self.db.commit()
+    
+    def touch(self, params):
+        """서버가 바뀌지 않았다고 답한 경우(304) 받은 시각만 갱신"""
+        now = time.time()
+        with self._lock:
+            self.db.execute("UPDATE images SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                            (now, now, self.key(params)))
+            self.db.commit()
+    
+    def nearest(self, params, max_level_diff=3):
+        """같은 크기/지도 종류 중 가장 가까운 화면의 (이미지 바이트, 그 화면의 center, level)
+        
+        레벨 차이가 적은 것을 먼저, 같으면 중심 거리가 가까운 것을 고른다.
+        """
+        lng, lat, level, w, h, maptype, markers = _view(params)
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT key, lng, lat, level FROM images "
+                "WHERE w = ? AND h = ? AND maptype = ? AND markers = ? AND level BETWEEN ? AND ?",
+                (w, h, maptype, markers, level - max_level_diff, level + max_level_diff)
+            ).fetchall()
+            if not rows:
+                return None
+            
+            cos_lat = math.cos(math.radians(lat))
+            key, c_lng, c_lat, c_level = min(rows, key=lambda r: (
+                abs(r[3] - level), math.hypot((r[1] - lng) * cos_lat, r[2] - lat)
+            ))
+            data = self.db.execute("SELECT data FROM images WHERE key = ?", (key,)).fetchone()[0]
+            self.db.execute("UPDATE images SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+            self.fallbacks += 1
+        return data, f"{c_lng},{c_lat}", c_level
+    
+    def _evict(self):
+        # lock 안에서 호출
+        while self.bytes > self.max_bytes:
+            rows = self.db.execute(
+                "SELECT key, size FROM images ORDER BY accessed_at LIMIT 32"
+            ).fetchall()
+            if not rows:
+                self.bytes = 0
+                return
+            for key, size in rows:
+                self.db.execute("DELETE FROM images WHERE key = ?", (key,))
+                self.bytes -= size
+                self.evictions += 1
+                if self.bytes <= self.max_bytes:
+                    return
+    
+    def close(self):
+        with self._lock:
+            self.db.close()
+    
+    def stats(self):
+        with self._lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        return {
+            "entries": entries,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+
+
+class MapLoader(QObject):
+    """StaticMap 이미지를 작업 스레드에서 받아 image_ready 시그널로 넘겨주는 로더
+    
+    request()를 연달아 호출하면 delay_ms 동안 모아 마지막 화면 하나만 요청한다.
+    작업 스레드가 모두 바쁘면 가장 최근 요청 하나만 대기시키고, 더 최근 요청이 있는
+    응답(지나간 화면)은 버린다. 시그널은 UI 스레드에서 받으므로 QPixmap 변환은 받는 쪽에서 한다.
+    """
+    
+    image_ready = pyqtSignal(object, QImage)  # 요청한 params, 이미지
+    
+    def __init__(self, static_map, max_workers=2, delay_ms=80, parent=None):
+        super().__init__(parent)
+        self.static_map = static_map
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="map")
+        
+        self._lock = threading.Lock()
+        self._generation = 0      # request()마다 증가
+        self._pending = None      # 작업 스레드를 기다리는 (generation, params)
+        self._in_flight = 0
+        self._closed = False
+        
+        self.requested = 0
+        self.fetched = 0
+        self.coalesced = 0        # 보내기 전에 더 최근 요청으로 대체된 수
+        self.dropped = 0          # 받았지만 지나간 화면이라 버린 수
+        
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._submit_latest)
+        self._delay_ms = delay_ms
+    
+    def request(self, params=None):
+        """현재(또는 주어진) 지도 설정으로 이미지 요청, 바로 반환"""
+        if params is None:
+            params = self.static_map.snapshotParams()
+        
+        with self._lock:
+            self._generation += 1
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (self._generation, params)
+            self.requested += 1
+        
+        if self._delay_ms:
+            self._timer.start(self._delay_ms)
+        else:
+            self._submit_latest()
+    
+    def close(self):
+        self._closed = True
+        self._timer.stop()
+        self.executor.shutdown(wait=False)
+    
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "fetched": self.fetched,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "in_flight": self._in_flight,
+        }
+    
+    def _submit_latest(self):
+        with self._lock:
+            if self._closed or self._pending is None or self._in_flight >= self.max_workers:
+                return
+            generation, params = self._pending
+            self._pending = None
+            self._in_flight += 1
+        
+        self.executor.submit(self._fetch, generation, params)
+    
+    def _fetch(self, generation, params):
+        try:
+            image = self.static_map.getMapQImage(params)
+        except Exception as e:
+            print(f"Map loader error: {e}")
+            image = None
+        
+        with self._lock:
+            self._in_flight -= 1
+            current = generation == self._generation
+            if not current:
+                self.dropped += 1
+            elif image is not None:
+                self.fetched += 1
+            has_pending = self._pending is not None
+        
+        if current and image is not None and not self._closed:
+            self.image_ready.emit(params, image)
+        
+        if has_pending and not self._closed:
+            # 대기 중인 요청은 다음 작업으로 바로 보냄 (지연 타이머는 UI 스레드에만 있음)
+            self._submit_latest()
@@ -20,7 +20,7 @@ class MapOverlayWidget(QWidget):
         main_layout.setAlignment(Qt.AlignTop | Qt.AlignLeft)
         
         self.rtk_indicator = QWidget()
-        self.rtk_indicator.setFixedSize(150, 40)
+        self.rtk_indicator.setFixedSize(190, 40)
         self.rtk_indicator.setStyleSheet("""
             QWidget {
                 background-color: rgba(255, 255, 255, 230);
@@ -125,11 +125,30 @@ class MapOverlayWidget(QWidget):
             self.input_ip.clear()
             self.input_name.clear()
     
-    def set_rtk_status(self, connected: bool):
+    def set_rtk_status(self, connected: bool, correction_age=None, state=None):
+        """state: NtripManager 연결 상태 (연결 중/데이터 대기/보정정보만 수신 중이면 그 단계를 표시)"""
         self.rtk_status = connected
-        if connected:
+        if state in ("connecting", "reconnecting", "stalled", "disconnected"):
+            self.rtk_dot.setStyleSheet("color: #ffaa00; font-size: 20px;")
+            self.rtk_label.setText(f"NTRIP: {state}")
+        elif state == "connected" and not connected:
+            # 캐스터 응답은 받았지만 아직 보정정보 없음 (VRS는 GGA 대기)
+            self.rtk_dot.setStyleSheet("color: #ffaa00; font-size: 20px;")
+            self.rtk_label.setText("NTRIP: waiting data")
+        elif state == "streaming" and not connected:
+            # 보정정보는 들어오고 있지만 아직 RTK 해 없음
+            self.rtk_dot.setStyleSheet("color: #ffff44; font-size: 20px;")
+            if correction_age is None:
+                self.rtk_label.setText("RTCM: ON")
+            else:
+                self.rtk_label.setText(f"RTCM: ON {correction_age:.1f}s")
+        elif connected:
             self.rtk_dot.setStyleSheet("color: #44ff44; font-size: 20px;")
-            self.rtk_label.setText("RTK: ON")
+            if correction_age is None:
+                self.rtk_label.setText("RTK: ON")
+            else:
+                # 보정정보 수신 후 경과 시간 (age of corrections)
+                self.rtk_label.setText(f"RTK: ON {correction_age:.1f}s")
         else:
             self.rtk_dot.setStyleSheet("color: #ff4444; font-size: 20px;")
             self.rtk_label.setText("RTK: OFF")
@@ -0,0 +1,226 @@
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QPainter
+
+
+TILE_SIZE = 512
+TILE_SIZES = (256, 512, 1024)  # 격자가 맞아떨어지도록 2의 거듭제곱, Static Map 최대 1024px
+MAX_LAT = 85.05112878
+BACKGROUND = QColor(200, 200, 200)
+
+
+def world_size(level):
+    """레벨 전체 지도의 픽셀 크기 (Web Mercator)
+    
+    Naver 레벨 L은 256px 타일 기준 줌 L+1에 해당한다 (marker_overlay.cal_meters_per_pixel과 같은 기준).
+    """
+    return 256 * 2 ** (level + 1)
+
+
+def lnglat_to_pixel(lng, lat, level):
+    size = world_size(level)
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    s = math.sin(math.radians(lat))
+    x = (lng + 180.0) / 360.0 * size
+    y = (0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * size
+    return x, y
+
+
+def pixel_to_lnglat(x, y, level):
+    size = world_size(level)
+    lng = x / size * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / size))))
+    return lng, lat
+
+
+def viewport_origin(params):
+    """화면 좌상단의 전체 지도 픽셀 좌표 (정수로 맞춤)"""
+    lng, lat = map(float, str(params["center"]).split(","))
+    x, y = lnglat_to_pixel(lng, lat, int(params["level"]))
+    return int(math.floor(x - params["w"] / 2 + 0.5)), int(math.floor(y - params["h"] / 2 + 0.5))
+
+
+def visible_tiles(params, tile_size=TILE_SIZE):
+    """화면을 덮는 타일 [((tx, ty), 화면 x, 화면 y), ...], 지도 밖(위/아래) 타일은 제외"""
+    level = int(params["level"])
+    ox, oy = viewport_origin(params)
+    count = world_size(level) // tile_size
+    
+    tiles = []
+    for ty in range(oy // tile_size, (oy + params["h"] - 1) // tile_size + 1):
+        if ty < 0 or ty >= count:
+            continue
+        for tx in range(ox // tile_size, (ox + params["w"] - 1) // tile_size + 1):
+            tiles.append(((tx % count, ty), tx * tile_size - ox, ty * tile_size - oy))
+    return tiles
+
+
+def tile_params(level, tx, ty, tile_size=TILE_SIZE, maptype="basic"):
+    """타일 하나를 받을 Static Map 요청 파라미터 (타일 중심 기준)"""
+    lng, lat = pixel_to_lnglat((tx + 0.5) * tile_size, (ty + 0.5) * tile_size, level)
+    return {
+        "center": f"{lng:.7f},{lat:.7f}",
+        "level": level,
+        "maptype": maptype,
+        "w": tile_size,
+        "h": tile_size
+    }
+
+
+class TileMapLoader(QObject):
+    """화면을 레벨별 고정 격자 타일로 나눠 받아 한 장으로 합치는 로더 (MapLoader와 같은 사용법)
+    
+    타일은 Static Map API로 타일 중심을 요청해 받고, StaticMap의 메모리/디스크 캐시에 타일 단위로
+    저장되므로 화면을 옮기면 새로 드러난 가장자리 타일만 받는다.
+    타일이 도착할 때마다 모아서 다시 합쳐 image_ready로 넘기고, 화면에서 벗어난 타일 요청은
+    작업 스레드가 꺼낼 때 건너뛴다. 합친 이미지에는 정적 마커(params의 markers)를 그리지 않는다.
+    """
+    
+    image_ready = pyqtSignal(object, QImage)  # 화면 params, 합친 이미지
+    _tile_loaded = pyqtSignal()               # 작업 스레드 -> UI 스레드
+    
+    def __init__(self, static_map, tile_size=TILE_SIZE, max_workers=4, delay_ms=30, parent=None):
+        super().__init__(parent)
+        if tile_size not in TILE_SIZES:
+            raise ValueError(f"tile size must be one of {TILE_SIZES}: {tile_size}")
+        self.static_map = static_map
+        self.tile_size = tile_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile")
+        
+        self._lock = threading.Lock()
+        self._tiles = {}          # {(level, maptype, tx, ty): QImage} 현재 화면의 받은 타일
+        self._wanted = set()      # 현재 화면에 필요한 타일 키
+        self._loading = set()
+        self._params = None       # 현재 화면 params
+        self._closed = False
+        
+        self.requested = 0
+        self.tiles_fetched = 0
+        self.tiles_reused = 0     # 이미 있거나 메모리 캐시에서 바로 꺼낸 타일
+        self.tiles_failed = 0
+        self.tiles_skipped = 0    # 받기 전에 화면에서 벗어난 타일
+        
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._compose)
+        self._delay_ms = delay_ms
+        self._tile_loaded.connect(self._schedule_compose)
+    
+    def request(self, params=None):
+        """현재(또는 주어진) 지도 설정으로 화면 구성, 없는 타일만 작업 스레드로 요청"""
+        if params is None:
+            params = self.static_map.snapshotParams()
+        params = {k: v for k, v in params.items() if k != "markers"}
+        level = int(params["level"])
+        maptype = params.get("maptype", "basic")
+        
+        missing = []
+        with self._lock:
+            self.requested += 1
+            self._params = params
+            self._wanted = {(level, maptype, tx, ty) for (tx, ty), _, _ in visible_tiles(params, self.tile_size)}
+            self._tiles = {key: image for key, image in self._tiles.items() if key in self._wanted}
+            
+            for key in self._wanted:
+                if key in self._tiles:
+                    self.tiles_reused += 1
+                elif key not in self._loading:
+                    missing.append(key)
+        
+        cache = self.static_map.cache
+        for key in missing:
+            tile = tile_params(key[0], key[2], key[3], self.tile_size, key[1])
+            image = cache.get(tile) if cache else None
+            with self._lock:
+                if image is not None:
+                    self._tiles[key] = image
+                    self.tiles_reused += 1
+                else:
+                    self._loading.add(key)
+            if image is None:
+                self.executor.submit(self._fetch, key, tile)
+        
+        self._compose()
+    
+    def close(self):
+        self._closed = True
+        self._timer.stop()
+        self.executor.shutdown(wait=False)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "requested": self.requested,
+                "tiles_fetched": self.tiles_fetched,
+                "tiles_reused": self.tiles_reused,
+                "tiles_failed": self.tiles_failed,
+                "tiles_skipped": self.tiles_skipped,
+                "loading": len(self._loading),
+                "visible": len(self._wanted),
+            }
+    
+    def _fetch(self, key, tile):
+        with self._lock:
+            if self._closed or key not in self._wanted:
+                self._loading.discard(key)
+                self.tiles_skipped += 1
+                return
+        
+        try:
+            image = self.static_map.getMapQImage(tile, fallback=False)
+        except Exception as e:
+            print(f"Map tile error: {e}")
+            image = None
+        
+        with self._lock:
+            self._loading.discard(key)
+            if image is None:
+                # 저장하지 않으므로 다음 request()에서 다시 요청
+                self.tiles_failed += 1
+                return
+            self.tiles_fetched += 1
+            if key not in self._wanted:
+                return
+            self._tiles[key] = image
+        
+        if not self._closed:
+            self._tile_loaded.emit()
+    
+    def _schedule_compose(self):
+        # 타일이 연달아 도착하면 delay_ms 동안 모아 한 번만 합침
+        if not self._timer.isActive():
+            self._timer.start(self._delay_ms)
+    
+    def _compose(self):
+        with self._lock:
+            params = self._params
+            tiles = dict(self._tiles)
+        if params is None or self._closed:
+            return
+        
+        level = int(params["level"])
+        maptype = params.get("maptype", "basic")
+        placed = []
+        for (tx, ty), x, y in visible_tiles(params, self.tile_size):
+            image = tiles.get((level, maptype, tx, ty))
+            if image is not None:
+                placed.append((x, y, image))
+        if not placed:
+            # 받은 타일이 하나도 없으면 이전 지도를 그대로 둠 (줌 직후 회색 화면 방지)
+            return
+        
+        image = QImage(params["w"], params["h"], QImage.Format_RGB32)
+        image.fill(BACKGROUND)
+        painter = QPainter(image)
+        for x, y, tile in placed:
+            painter.drawImage(x, y, tile)
+        painter.end()
+        
+        # 합친 이미지의 중심은 픽셀 단위로 맞춘 좌상단 기준이므로 마커 배치도 그 중심을 씀
+        ox, oy = viewport_origin(params)
+        lng, lat = pixel_to_lnglat(ox + params["w"] / 2, oy + params["h"] / 2, level)
+        view = dict(params, center=f"{lng:.7f},{lat:.7f}")
+        self.image_ready.emit(view, image)
@@ -58,7 +58,8 @@ class MarkerOverlay(QWidget):
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.setStyleSheet("background: transparent;")
         
-        self.markers = []  # [(screen_x, screen_y, color, label), ...]
+        self.markers = {}  # {ip: (screen_x, screen_y, color, label)}
+        self.sensor_positions = {}  # {ip: (channel, (lng, lat), power)}
         self.map_center = (127.1054328, 37.3595963)  # (lng, lat)
         self.map_zoom = 10
         self.map_size = (800, 600)
@@ -70,35 +71,58 @@ class MarkerOverlay(QWidget):
         self.map_center = (center_lng, center_lat)
         self.map_zoom = zoom
         self.map_size = (width, height)
+        
+        # 지도가 바뀌면 모든 마커의 화면 좌표가 바뀜
+        self.markers = {}
+        for ip in self.sensor_positions:
+            self._layout_marker(ip)
     
     def update_markers(self, sensors, gps_data, power_status):
-        self.markers = []
+        self.sensor_positions = {}
+        self.markers = {}
         
         for ip, channel in sensors.items():
-            pos = gps_data.get(ip)
-            power = power_status.get(ip)
-            
-            if pos is None:
-                continue
-            
-            lng, lat = pos
-            
-            screen_x, screen_y = self._gps_to_screen(lng, lat)
-            
-            # 화면 범위 내에 있는지 확인
-            if 0 <= screen_x <= self.map_size[0] and 0 <= screen_y <= self.map_size[1]:
-                if power is None:
-                    color = QColor(150, 150, 150)
-                elif power:
-                    color = QColor(0, 200, 0)
-                else:
-                    color = QColor(200, 0, 0)
-                
-                self.markers.append((screen_x, screen_y, color, channel))
+            self.sensor_positions[ip] = (channel, gps_data.get(ip), power_status.get(ip))
+            self._layout_marker(ip)
         
         if self.isVisible():
             self.update()
     
+    def update_records(self, records, removed=()):
+        """바뀐 센서만 반영 (records: {ip: SensorRecord}, removed: 삭제된 ip 목록)"""
+        for ip in removed:
+            self.sensor_positions.pop(ip, None)
+            self.markers.pop(ip, None)
+        
+        for ip, record in records.items():
+            self.sensor_positions[ip] = (record.channel, record.position, record.power)
+            self._layout_marker(ip)
+        
+        if (records or removed) and self.isVisible():
+            self.update()
+    
+    def _layout_marker(self, ip):
+        channel, pos, power = self.sensor_positions[ip]
+        self.markers.pop(ip, None)
+        
+        if pos is None:
+            return
+        
+        lng, lat = pos
+        
+        screen_x, screen_y = self._gps_to_screen(lng, lat)
+        
+        # 화면 범위 내에 있는지 확인
+        if 0 <= screen_x <= self.map_size[0] and 0 <= screen_y <= self.map_size[1]:
+            if power is None:
+                color = QColor(150, 150, 150)
+            elif power:
+                color = QColor(0, 200, 0)
+            else:
+                color = QColor(200, 0, 0)
+            
+            self.markers[ip] = (screen_x, screen_y, color, channel)
+    
     def _gps_to_screen(self, lng, lat):
         center_lng, center_lat = self.map_center
         width, height = self.map_size
@@ -124,7 +148,7 @@ class MarkerOverlay(QWidget):
         try:
             painter.setRenderHint(QPainter.Antialiasing)
             
-            for x, y, color, label in self.markers:
+            for x, y, color, label in self.markers.values():
                 painter.setBrush(color)
                 painter.setPen(QPen(QColor(255, 255, 255), 3))
                 painter.drawEllipse(x - 15, y - 15, 30, 30)
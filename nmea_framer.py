@@ -0,0 +1,65 @@
+class NmeaFramer:
+    """TCP 스트림에서 '$...\r\n' NMEA 문장을 잘라내는 버퍼 기반 프레이머
+    
+    recv 크기와 무관하게 동작하며, 읽기 사이에 잘린 문장은 다음 feed()까지 보관한다.
+    """
+    
+    def __init__(self, max_sentence=1024, chunk_size=65536):
+        self.max_sentence = max_sentence
+        self.buffer = bytearray()
+        self.dropped_bytes = 0
+        self._chunk = bytearray(chunk_size)
+        self._chunk_view = memoryview(self._chunk)
+    
+    def read_from(self, sock):
+        """소켓에서 한 번 읽고 완성된 문장 목록 반환 (연결 종료 시 None)"""
+        n = sock.recv_into(self._chunk)
+        if n == 0:
+            return None
+        return self.feed(self._chunk_view[:n])
+    
+    def feed(self, data):
+        """data를 버퍼에 추가하고 완성된 문장(CRLF 제외, bytes) 목록 반환"""
+        buf = self.buffer
+        buf += data
+        
+        sentences = []
+        pos = 0
+        
+        with memoryview(buf) as view:
+            while True:
+                end = buf.find(b'\r\n', pos)
+                if end < 0:
+                    break
+                
+                start = self._find_start(buf, pos, end)
+                if start < 0:
+                    self.dropped_bytes += end + 2 - pos
+                else:
+                    self.dropped_bytes += start - pos
+                    sentences.append(bytes(view[start:end]))
+                
+                pos = end + 2
+        
+        if pos:
+            del buf[:pos]
+        
+        # 종료 문자 없이 너무 길어진 경우 마지막 시작 문자부터만 보관
+        if len(buf) > self.max_sentence:
+            start = max(buf.rfind(b'$'), buf.rfind(b'!'))
+            if start <= 0 or len(buf) - start > self.max_sentence:
+                self.dropped_bytes += len(buf)
+                buf.clear()
+            else:
+                self.dropped_bytes += start
+                del buf[:start]
+        
+        return sentences
+    
+    def reset(self):
+        self.buffer.clear()
+    
+    @staticmethod
+    def _find_start(buf, pos, end):
+        # CRLF 직전까지 중 가장 마지막 시작 문자 (앞쪽 잡음 무시)
+        return max(buf.rfind(b'$', pos, end), buf.rfind(b'!', pos, end))
@@ -0,0 +1,272 @@
+import datetime
+import math
+
+
+class NmeaFix:
+    """NMEA 문장 하나에서 얻은 측위 정보 (없는 값은 None)"""
+    __slots__ = (
+        "kind", "talker", "time", "date", "lat", "lng", "alt",
+        "quality", "sats", "hdop", "pdop", "vdop", "mode",
+        "sigma", "sigma_alt", "speed", "course", "valid"
+    )
+    
+    def __init__(self, kind, talker):
+        self.kind = kind          # "GGA", "RMC", "GST", "GSA", "VTG"
+        self.talker = talker      # "GP", "GN", ...
+        self.time = None          # UTC 자정 기준 초
+        self.date = None          # datetime.date (RMC)
+        self.lat = None
+        self.lng = None
+        self.alt = None           # 평균 해수면 기준 고도 (m)
+        self.quality = None       # GGA: 0=No fix, 1=GPS, 2=DGPS, 4=RTK fixed, 5=RTK float
+        self.sats = None
+        self.hdop = None
+        self.pdop = None
+        self.vdop = None
+        self.mode = None          # GSA: 1=No fix, 2=2D, 3=3D
+        self.sigma = None         # GST: 수평 표준편차 (m)
+        self.sigma_alt = None     # GST: 고도 표준편차 (m)
+        self.speed = None         # 대지 속도 (m/s)
+        self.course = None        # 진북 기준 침로 (deg)
+        self.valid = None         # RMC: A/V
+    
+    def __repr__(self):
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self.__slots__[2:]
+            if getattr(self, name) is not None
+        )
+        return f"NmeaFix({self.talker}{self.kind}, {fields})"
+
+
+KNOT_TO_MS = 0.514444
+KMH_TO_MS = 1 / 3.6
+
+
+def nmea_checksum(body):
+    """'$'와 '*' 사이 바이트의 XOR 값 (바이트 단위 루프 대신 정수 접기로 계산)"""
+    n = len(body)
+    if n == 0:
+        return 0
+    
+    value = int.from_bytes(body, "big")
+    while n > 1:
+        half = n // 2
+        shift = half * 8
+        value = (value >> shift) ^ (value & ((1 << shift) - 1))
+        n -= half
+    return value
+
+
+def split_sentence(line):
+    """(본문 memoryview, 체크섬 일치 여부) 반환, 체크섬이 없으면 None"""
+    if isinstance(line, str):
+        line = line.encode("ascii", errors="ignore")
+    
+    end = len(line)
+    while end and line[end - 1] in (0x0A, 0x0D):
+        end -= 1
+    
+    if end < 1 or line[0] not in (0x24, 0x21):  # '$', '!'
+        return None, False
+    
+    view = memoryview(line)
+    star = line.rfind(b"*", 0, end)
+    if star < 0:
+        return view[1:end], None
+    
+    try:
+        expected = int(line[star + 1:end], 16)
+    except ValueError:
+        return view[1:star], False
+    
+    body = view[1:star]
+    return body, nmea_checksum(body) == expected
+
+
+def verify_checksum(line):
+    _, ok = split_sentence(line)
+    return ok is True
+
+
+def nmea_to_decimal(raw, hemisphere=b""):
+    """ddmm.mmmm(m) 형식 좌표를 십진 도로 변환 (S/W는 음수)"""
+    raw_float = float(raw)
+    degrees = int(raw_float / 100)
+    minutes = raw_float - degrees * 100
+    value = degrees + minutes / 60
+    if hemisphere in (b"S", b"W", "S", "W"):
+        value = -value
+    return value
+
+
+def _time_of_day(raw):
+    if not raw:
+        return None
+    value = float(raw)
+    hours = int(value // 10000)
+    minutes = int(value // 100) % 100
+    return hours * 3600 + minutes * 60 + (value % 100)
+
+
+def _float(raw):
+    return float(raw) if raw else None
+
+
+def _int(raw):
+    return int(raw) if raw else None
+
+
+def _coords(fix, lat, lat_hemi, lng, lng_hemi):
+    if lat and lng:
+        fix.lat = nmea_to_decimal(lat, lat_hemi)
+        fix.lng = nmea_to_decimal(lng, lng_hemi)
+
+
+def _parse_gga(fix, f):
+    # GGA,time,lat,N,lng,E,quality,sats,hdop,alt,M,geoid,M,age,station
+    fix.time = _time_of_day(f[1])
+    _coords(fix, f[2], f[3], f[4], f[5])
+    fix.quality = _int(f[6]) or 0
+    fix.sats = _int(f[7])
+    fix.hdop = _float(f[8])
+    fix.alt = _float(f[9])
+
+
+def _parse_rmc(fix, f):
+    # RMC,time,status,lat,N,lng,E,speed(knot),course,date,...
+    fix.time = _time_of_day(f[1])
+    fix.valid = f[2] == b"A"
+    _coords(fix, f[3], f[4], f[5], f[6])
+    speed = _float(f[7])
+    fix.speed = speed * KNOT_TO_MS if speed is not None else None
+    fix.course = _float(f[8])
+    if len(f[9]) == 6:
+        d = f[9]
+        year = int(d[4:6])
+        year += 2000 if year < 80 else 1900
+        fix.date = datetime.date(year, int(d[2:4]), int(d[0:2]))
+
+
+def _parse_gst(fix, f):
+    # GST,time,rms,major,minor,orient,lat_sd,lng_sd,alt_sd
+    fix.time = _time_of_day(f[1])
+    lat_sd = _float(f[6])
+    lng_sd = _float(f[7])
+    if lat_sd is not None and lng_sd is not None:
+        fix.sigma = math.hypot(lat_sd, lng_sd)
+    fix.sigma_alt = _float(f[8])
+
+
+def _parse_gsa(fix, f):
+    # GSA,mode1,mode2,sv1..sv12,pdop,hdop,vdop
+    fix.mode = _int(f[2])
+    fix.sats = sum(1 for sv in f[3:15] if sv)
+    fix.pdop = _float(f[15])
+    fix.hdop = _float(f[16])
+    fix.vdop = _float(f[17])
+
+
+def _parse_vtg(fix, f):
+    # VTG,course,T,course_m,M,speed,N,speed,K
+    fix.course = _float(f[1])
+    speed = _float(f[7])
+    fix.speed = speed * KMH_TO_MS if speed is not None else None
+
+
+# (파서, 최소 필드 수)
+_PARSERS = {
+    b"GGA": (_parse_gga, 10),
+    b"RMC": (_parse_rmc, 10),
+    b"GST": (_parse_gst, 9),
+    b"GSA": (_parse_gsa, 18),
+    b"VTG": (_parse_vtg, 8),
+}
+
+
+class NmeaParser:
+    """NMEA 0183 문장 파서, 센서별로 하나씩 두면 오류 통계를 따로 볼 수 있다"""
+    
+    def __init__(self, verify=True, require_checksum=True):
+        self.verify = verify
+        self.require_checksum = require_checksum
+        self.parsed = 0
+        self.checksum_errors = 0
+        self.format_errors = 0
+        self.unsupported = 0
+    
+    def parse(self, line):
+        """문장 하나를 NmeaFix로 변환, 지원하지 않거나 잘못된 문장이면 None"""
+        body, ok = split_sentence(line)
+        if body is None:
+            self.format_errors += 1
+            return None
+        
+        if self.verify and (ok is False or (ok is None and self.require_checksum)):
+            self.checksum_errors += 1
+            return None
+        
+        # 주소 필드: 'GPGGA' -> talker 'GP', kind 'GGA' ('$PxxxX' 등 독자 문장은 제외)
+        kind = bytes(body[2:5])
+        entry = _PARSERS.get(kind)
+        if entry is None or len(body) < 6 or body[5] != 0x2C:
+            self.unsupported += 1
+            return None
+        
+        parse, min_fields = entry
+        fields = body.tobytes().split(b",")
+        if len(fields) < min_fields:
+            self.format_errors += 1
+            return None
+        
+        fix = NmeaFix(kind.decode(), bytes(body[0:2]).decode("ascii", errors="replace"))
+        try:
+            parse(fix, fields)
+        except (ValueError, IndexError):
+            self.format_errors += 1
+            return None
+        
+        self.parsed += 1
+        return fix
+    
+    def parse_batch(self, lines):
+        """여러 문장을 한 번에 파싱, 유효한 NmeaFix만 순서대로 반환"""
+        parse = self.parse
+        fixes = []
+        for line in lines:
+            fix = parse(line)
+            if fix is not None:
+                fixes.append(fix)
+        return fixes
+    
+    def stats(self):
+        return {
+            "parsed": self.parsed,
+            "checksum_errors": self.checksum_errors,
+            "format_errors": self.format_errors,
+            "unsupported": self.unsupported,
+        }
+
+
+def parse_sentence(line, verify=True):
+    return NmeaParser(verify=verify).parse(line)
+
+
+def parse_batch(lines, verify=True):
+    return NmeaParser(verify=verify).parse_batch(lines)
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) < 2:
+        print("usage: python nmea_parser.py <nmea_log_file>")
+        sys.exit(1)
+    
+    parser = NmeaParser()
+    with open(sys.argv[1], "rb") as f:
+        fixes = parser.parse_batch(f.read().splitlines())
+    
+    for fix in fixes[-10:]:
+        print(fix)
+    print(parser.stats())
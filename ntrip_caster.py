@@ -0,0 +1,434 @@
+import argparse
+import base64
+import ipaddress
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+from rtcm_fanout import RtcmFanout
+
+
+def is_loopback(host):
+    """이 PC에서만 접속 가능한 주소인지 (localhost, 127.0.0.0/8, ::1)"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class _CasterClient:
+    """로컬 캐스터에 접속한 NTRIP 클라이언트 하나"""
+    __slots__ = (
+        "key", "sock", "addr", "buffer", "streaming", "version", "user",
+        "connected_at", "last_gga", "writing"
+    )
+    
+    def __init__(self, key, sock, addr):
+        self.key = key
+        self.sock = sock
+        self.addr = addr
+        self.buffer = bytearray()
+        self.streaming = False
+        self.version = 1
+        self.user = None
+        self.connected_at = time.monotonic()
+        self.last_gga = None
+        self.writing = False
+
+
+class NtripCaster:
+    """업스트림 RTCM 하나를 여러 로컬 NTRIP 클라이언트에 나눠주는 소형 캐스터
+    
+    send_rtcm(frames)로 받은 프레임을 RtcmFanout 큐를 통해 모든 클라이언트에 보낸다.
+    Rev1 클라이언트는 "ICY 200 OK" 뒤 원본 스트림을, Rev2 클라이언트는 chunked로 받는다.
+    클라이언트가 보낸 GGA 중 가장 최근 것은 nmea_message로 노출되므로, 이 객체를
+    NtripManager의 sensor_client 자리에 넣으면 단독 중계기로 동작한다.
+    """
+    
+    def __init__(self, host="127.0.0.1", port=2101, mountpoint="LOCAL", users=None,
+                 max_clients=64, queue_bytes=65536, position=(0.0, 0.0)):
+        self.host = host              # 기본은 이 PC에서만 접속 가능
+        self.port = port
+        self.mountpoint = mountpoint
+        self.users = users            # {user: password}, None이면 인증 없음
+        self.max_clients = max_clients
+        self.position = position      # 소스테이블에 표시할 (lat, lng)
+        
+        self.clients = {}  # {key: _CasterClient}
+        self.fanout_v1 = RtcmFanout(max_queue_bytes=queue_bytes, on_pending=self._schedule_flush)
+        self.fanout_v2 = RtcmFanout(max_queue_bytes=queue_bytes, on_pending=self._schedule_flush)
+        self.nmea_message = None
+        self.running = False
+        self.thread = None
+        self.selector = None
+        self.server = None
+        self.commands = deque()
+        self._flush_posted = False
+        self._next_key = 0
+        self._ready = threading.Event()
+    
+    # ---- 실행 제어 ----
+    
+    def start(self):
+        if self.running:
+            return
+        
+        self.server = socket.socket()
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen(128)
+        self.server.setblocking(False)
+        self.port = self.server.getsockname()[1]
+        
+        if self.users is None and not is_loopback(self.host):
+            # 로그인한 업스트림 보정정보를 네트워크 전체에 인증 없이 내보내게 됨
+            print(f"WARNING: NTRIP caster on {self.host}:{self.port} accepts anyone without a login "
+                  f"(set users to require one)")
+        
+        self.selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+        self.selector.register(self.server, selectors.EVENT_READ, self.server)
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        print(f"NTRIP caster listening on {self.host}:{self.port}/{self.mountpoint}")
+    
+    def stop(self, timeout=2.0):
+        self.running = False
+        self._wakeup()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+    
+    # ---- NtripManager 쪽 인터페이스 ----
+    
+    def send_rtcm(self, rtcm_data):
+        """업스트림 RTCM(bytes 또는 프레임 목록)을 모든 클라이언트 큐에 추가"""
+        if isinstance(rtcm_data, (bytes, bytearray, memoryview)):
+            rtcm_data = [bytes(rtcm_data)]
+        
+        if self.fanout_v1.queues:
+            self.fanout_v1.publish(rtcm_data)
+        if self.fanout_v2.queues:
+            # Rev2는 프레임마다 chunk 하나 (모든 Rev2 클라이언트가 같은 bytes를 공유)
+            self.fanout_v2.publish([
+                b"%x\r\n" % len(frame) + bytes(frame) + b"\r\n" for frame in rtcm_data
+            ])
+    
+    def stats(self):
+        now = time.monotonic()
+        clients = []
+        for client in list(self.clients.values()):
+            if not client.streaming:
+                continue
+            fanout = self.fanout_v2 if client.version == 2 else self.fanout_v1
+            queue = fanout.stats(client.key) or {}
+            elapsed = max(now - client.connected_at, 1e-9)
+            clients.append({
+                "addr": f"{client.addr[0]}:{client.addr[1]}",
+                "user": client.user,
+                "version": client.version,
+                "connected_s": round(elapsed, 1),
+                "sent_bytes": queue.get("sent_bytes", 0),
+                "bytes_per_s": round(queue.get("sent_bytes", 0) / elapsed, 1),
+                "queued_bytes": queue.get("queued_bytes", 0),
+                "dropped_frames": queue.get("dropped_frames", 0),
+            })
+        return {"clients": clients}
+    
+    # ---- 루프 ----
+    
+    def _wakeup(self):
+        try:
+            self._wakeup_w.send(b"\x00")
+        except (AttributeError, BlockingIOError, OSError):
+            pass
+    
+    def _schedule_flush(self):
+        if not self._flush_posted:
+            self._flush_posted = True
+            self.commands.append(self._flush)
+            self._wakeup()
+    
+    def _run(self):
+        try:
+            while self.running:
+                for key, mask in self.selector.select(1.0):
+                    if key.data is None:
+                        self._drain_wakeup()
+                    elif key.data is self.server:
+                        self._accept()
+                    else:
+                        self._handle_event(key.data, mask)
+                
+                while self.commands:
+                    self.commands.popleft()()
+        except Exception as e:
+            print(f"NTRIP caster error: {e}")
+        finally:
+            for client in list(self.clients.values()):
+                self._close(client)
+            self.selector.close()
+            self.server.close()
+            self._wakeup_r.close()
+            self._wakeup_w.close()
+    
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+    
+    def _accept(self):
+        while True:
+            try:
+                sock, addr = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                print(f"NTRIP caster accept error: {e}")
+                return
+            
+            sock.setblocking(False)
+            self._next_key += 1
+            client = _CasterClient(f"client-{self._next_key}", sock, addr)
+            self.clients[client.key] = client
+            self.selector.register(sock, selectors.EVENT_READ, client)
+    
+    def _close(self, client):
+        if self.clients.pop(client.key, None) is None:
+            return
+        self.fanout_v1.detach(client.key)
+        self.fanout_v2.detach(client.key)
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+        if client.streaming:
+            print(f"NTRIP caster client disconnected: {client.addr[0]}:{client.addr[1]}")
+    
+    def _handle_event(self, client, mask):
+        if mask & selectors.EVENT_WRITE:
+            self._write(client)
+            if client.key not in self.clients:
+                return
+        
+        if mask & selectors.EVENT_READ:
+            try:
+                data = client.sock.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self._close(client)
+                return
+            
+            if not data:
+                self._close(client)
+                return
+            
+            client.buffer += data
+            if client.streaming:
+                self._read_nmea(client)
+            else:
+                self._read_request(client)
+    
+    def _read_request(self, client):
+        end = client.buffer.find(b"\r\n\r\n")
+        if end < 0:
+            if len(client.buffer) > 8192:
+                self._respond(client, b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+            return
+        
+        header = bytes(client.buffer[:end]).decode("latin-1")
+        del client.buffer[:end + 4]
+        lines = header.split("\r\n")
+        parts = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            key, sep, value = line.partition(":")
+            if sep:
+                headers[key.strip().lower()] = value.strip()
+        
+        if len(parts) < 2 or parts[0] != "GET":
+            self._respond(client, b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+            return
+        
+        client.version = 2 if "ntrip/2" in headers.get("ntrip-version", "").lower() else 1
+        mount = parts[1].lstrip("/")
+        
+        if mount != self.mountpoint:
+            self._send_sourcetable(client)
+            return
+        
+        client.user = self._authenticate(headers.get("authorization"))
+        if client.user is False:
+            if client.version == 2:
+                self._respond(client, b"HTTP/1.1 401 Unauthorized\r\nNtrip-Version: Ntrip/2.0\r\n"
+                                      b"WWW-Authenticate: Basic realm=\"/" + mount.encode() + b"\"\r\n"
+                                      b"Connection: close\r\n\r\n")
+            else:
+                self._respond(client, b"HTTP/1.0 401 Unauthorized\r\n\r\n")
+            return
+        
+        if sum(1 for c in self.clients.values() if c.streaming) >= self.max_clients:
+            self._respond(client, b"HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\n\r\n")
+            return
+        
+        if client.version == 2:
+            response = (b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\nServer: NTRIP LocalCaster\r\n"
+                        b"Content-Type: gnss/data\r\nCache-Control: no-store, no-cache, max-age=0\r\n"
+                        b"Pragma: no-cache\r\nConnection: close\r\nTransfer-Encoding: chunked\r\n\r\n")
+        else:
+            response = b"ICY 200 OK\r\n"
+        
+        if not self._send_now(client, response):
+            return
+        
+        client.streaming = True
+        client.connected_at = time.monotonic()
+        fanout = self.fanout_v2 if client.version == 2 else self.fanout_v1
+        fanout.attach(client.key, client.sock)
+        print(f"NTRIP caster client connected: {client.addr[0]}:{client.addr[1]} "
+              f"(Rev{client.version}, user: {client.user})")
+        
+        if client.buffer:
+            self._read_nmea(client)
+    
+    def _authenticate(self, authorization):
+        """사용자 이름, 인증 없으면 None, 실패면 False"""
+        if self.users is None:
+            return None
+        if not authorization or not authorization.lower().startswith("basic "):
+            return False
+        try:
+            user, _, password = base64.b64decode(authorization[6:].strip()).decode().partition(":")
+        except (ValueError, UnicodeDecodeError):
+            return False
+        return user if self.users.get(user) == password else False
+    
+    def _send_sourcetable(self, client):
+        lat, lng = self.position
+        table = (f"STR;{self.mountpoint};{self.mountpoint};RTCM 3;;2;GNSS;LOCAL;;"
+                 f"{lat:.2f};{lng:.2f};1;0;NTRIP LocalCaster;none;"
+                 f"{'B' if self.users is not None else 'N'};N;0;\r\n"
+                 "ENDSOURCETABLE\r\n").encode()
+        if client.version == 2:
+            header = (b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\nContent-Type: gnss/sourcetable\r\n"
+                      b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(table))
+        else:
+            header = b"SOURCETABLE 200 OK\r\nContent-Type: text/plain\r\nContent-Length: %d\r\n\r\n" % len(table)
+        self._respond(client, header + table)
+    
+    def _respond(self, client, data):
+        """응답을 보내고 연결 종료 (요청 오류/소스테이블)"""
+        self._send_now(client, data)
+        self._close(client)
+    
+    def _send_now(self, client, data):
+        # 새 연결의 송신 버퍼는 비어 있으므로 짧은 응답은 한 번에 나간다
+        try:
+            sent = client.sock.send(data)
+        except OSError:
+            sent = -1
+        if sent != len(data):
+            self._close(client)
+            return False
+        return True
+    
+    def _read_nmea(self, client):
+        # 클라이언트가 올리는 GGA는 업스트림 VRS용으로 최신 것만 보관
+        while True:
+            end = client.buffer.find(b"\n")
+            if end < 0:
+                if len(client.buffer) > 4096:
+                    client.buffer.clear()
+                return
+            line = bytes(client.buffer[:end]).strip()
+            del client.buffer[:end + 1]
+            if line[3:6] == b"GGA" and line.startswith(b"$"):
+                client.last_gga = line.decode("ascii", errors="ignore")
+                self.nmea_message = client.last_gga
+    
+    def _flush(self):
+        self._flush_posted = False
+        for fanout in (self.fanout_v1, self.fanout_v2):
+            for key in fanout.pending_ips():
+                client = self.clients.get(key)
+                if client:
+                    self._write(client)
+    
+    def _write(self, client):
+        fanout = self.fanout_v2 if client.version == 2 else self.fanout_v1
+        try:
+            done = fanout.write(client.key)
+        except OSError:
+            self._close(client)
+            return
+        
+        if client.writing == done:
+            client.writing = not done
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.writing else 0)
+            self.selector.modify(client.sock, events, client)
+
+
+def main(argv=None):
+    from ntrip_client import NtripClient
+    from ntrip_manager import NtripManager
+    
+    parser = argparse.ArgumentParser(description="Local NTRIP caster relaying one upstream mountpoint")
+    parser.add_argument("--upstream", required=True, help="upstream caster host:port")
+    parser.add_argument("--upstream-mount", required=True)
+    parser.add_argument("--upstream-user", default="")
+    parser.add_argument("--upstream-password", default="")
+    parser.add_argument("--listen", default="127.0.0.1:2101",
+                        help="local host:port (other than loopback requires --user or --no-auth)")
+    parser.add_argument("--mount", default="LOCAL", help="local mountpoint name")
+    parser.add_argument("--user", action="append", default=[], metavar="USER:PASSWORD",
+                        help="allowed local user (repeatable, no auth if omitted)")
+    parser.add_argument("--no-auth", action="store_true",
+                        help="allow listening beyond loopback without --user")
+    parser.add_argument("--stats-interval", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    
+    upstream_host, _, upstream_port = args.upstream.rpartition(":")
+    listen_host, _, listen_port = args.listen.rpartition(":")
+    users = dict(u.split(":", 1) for u in args.user) if args.user else None
+    listen_host = listen_host or "127.0.0.1"
+    if users is None and not is_loopback(listen_host) and not args.no_auth:
+        parser.error(f"--listen {args.listen} exposes the upstream stream to the network; "
+                     f"add --user USER:PASSWORD (or --no-auth)")
+    
+    caster = NtripCaster(listen_host, int(listen_port), args.mount, users)
+    caster.start()
+    
+    upstream = NtripClient(upstream_host, int(upstream_port), args.upstream_user,
+                           args.upstream_password, args.upstream_mount)
+    # 업스트림 GGA는 로컬 클라이언트가 올린 최신 GGA를 사용
+    manager = NtripManager(upstream, caster)
+    manager.start()
+    
+    try:
+        while True:
+            time.sleep(args.stats_interval)
+            print(manager.stats()["state"], caster.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+        caster.stop()
+
+
+if __name__ == "__main__":
+    main()
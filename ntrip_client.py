@@ -2,51 +2,243 @@ import socket
 import base64
 
 
+class ChunkedDecoder:
+    """HTTP chunked transfer 인코딩 증분 디코더 (NTRIP 2.0)
+    
+    recv 경계와 무관하게 feed()에 넣은 만큼 본문 바이트를 돌려준다.
+    """
+    
+    _SIZE, _DATA, _DATA_END, _TRAILER = range(4)
+    
+    def __init__(self, max_line=1024):
+        self.max_line = max_line
+        self.line = bytearray()
+        self.state = self._SIZE
+        self.remaining = 0
+        self.finished = False
+    
+    def feed(self, data):
+        out = bytearray()
+        view = memoryview(data)
+        pos = 0
+        size = len(view)
+        
+        while pos < size and not self.finished:
+            if self.state == self._DATA:
+                n = min(self.remaining, size - pos)
+                out += view[pos:pos + n]
+                pos += n
+                self.remaining -= n
+                if self.remaining == 0:
+                    self.state = self._DATA_END
+                continue
+            
+            # 크기 줄, 데이터 뒤 CRLF, trailer는 줄 단위로 읽음
+            end = data.find(b"\n", pos)
+            if end < 0:
+                self.line += view[pos:]
+                if len(self.line) > self.max_line:
+                    raise ValueError("chunk header too long")
+                break
+            
+            self.line += view[pos:end]
+            pos = end + 1
+            line = bytes(self.line).strip()
+            self.line.clear()
+            
+            if self.state == self._SIZE:
+                try:
+                    self.remaining = int(line.split(b";", 1)[0], 16)
+                except ValueError:
+                    raise ValueError(f"invalid chunk size: {line[:32]!r}")
+                self.state = self._DATA if self.remaining else self._TRAILER
+            elif self.state == self._DATA_END:
+                if line:
+                    raise ValueError("missing CRLF after chunk data")
+                self.state = self._SIZE
+            elif not line:
+                self.finished = True
+        
+        return bytes(out)
+
+
 class NtripClient:
+    """NTRIP 캐스터 클라이언트 (Rev1 "ICY 200 OK" / Rev2 HTTP 응답, chunked 지원)"""
     
-    def __init__(self, addr, port, id, pw, mount):
+    def __init__(self, addr, port, id, pw, mount, ntrip_version=2, timeout=10.0):
         self.host_address = addr
         self.host_port = port
         self.user_id = id
         self.user_pw = pw
         self.mount_point = mount
+        self.ntrip_version = ntrip_version
+        self.timeout = timeout
         self.auth = base64.b64encode(f"{self.user_id}:{self.user_pw}".encode()).decode()
+        
+        self.socket = None
+        self.connected = False
+        self.last_error = None
+        self.status = None           # 응답 상태 줄
+        self.server_version = None   # 응답으로 판단한 NTRIP 버전 (1 또는 2)
+        self._dechunker = None
+        self._pending = b""          # 헤더와 같이 받은 본문
     
     def connect(self):
-        self.socket = socket.socket()
-        self.socket.connect((self.host_address, self.host_port))
-        
-        msg = f"GET /{self.mount_point} HTTP/1.1\r\n"
-        msg += "User-Agent: NTRIP ntripclient\r\n"
-        msg += "Authorization: Basic " + self.auth + "\r\n"
-        msg += "Accept: */*\r\nConnection: close\r\n"
-        msg += "\r\n"
-        
-        self.socket.send(msg.encode())
+        self.close()
+        self.last_error = None
         
-        buffer = self.socket.recv(4096)
-        result = buffer.decode("utf-8")
+        try:
+            self.socket = socket.create_connection((self.host_address, self.host_port), timeout=self.timeout)
+            self.socket.sendall(self._request().encode())
+            header, body = self._read_header(self.socket)
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            print(f"Failed to connect to NTRIP Server: {e}")
+            self.close()
+            return False
         
+        result = header.decode("utf-8", errors="replace")
         print("NTRIP Server Response:")
         print(result)
         
-        if "ICY 200 OK" in result:
-            print("Connected to NTRIP Server")
-            return True
+        status = result.split("\r\n", 1)[0].strip()
+        self.status = status
+        if status.startswith("ICY 200"):
+            self.server_version = 1
+        elif status.startswith("HTTP/") and status.split()[1:2] == ["200"]:
+            self.server_version = 2
+            if self._header_value(result, "transfer-encoding") == "chunked":
+                self._dechunker = ChunkedDecoder()
         else:
+            if status.startswith("SOURCETABLE"):
+                self.last_error = f"mountpoint not found: {self.mount_point}"
+            else:
+                self.last_error = status or "empty response"
             print("Failed to connect to NTRIP Server")
+            self.close()
             return False
+        
+        self._pending = self._dechunker.feed(body) if self._dechunker else body
+        self.connected = True
+        print("Connected to NTRIP Server")
+        return True
+    
+    def fetch_sourcetable(self, limit=4 * 1024 * 1024):
+        """캐스터 소스테이블 텍스트 ("GET /" 요청, 스트리밍 연결과 별도 소켓)"""
+        request = "GET / HTTP/1.1\r\n"
+        request += f"Host: {self.host_address}:{self.host_port}\r\n"
+        if self.ntrip_version >= 2:
+            request += "Ntrip-Version: Ntrip/2.0\r\n"
+        request += "User-Agent: NTRIP ntripclient\r\n"
+        request += "Authorization: Basic " + self.auth + "\r\n"
+        request += "Connection: close\r\n\r\n"
+        
+        with socket.create_connection((self.host_address, self.host_port), timeout=self.timeout) as sock:
+            sock.sendall(request.encode())
+            header, body = self._read_header(sock)
+            
+            status = header.split(b"\r\n", 1)[0].decode("latin-1").strip()
+            if not (status.startswith("SOURCETABLE 200") or
+                    (status.startswith("HTTP/") and status.split()[1:2] == ["200"])):
+                raise ValueError(f"sourcetable request failed: {status}")
+            
+            dechunker = None
+            if self._header_value(header.decode("latin-1"), "transfer-encoding") == "chunked":
+                dechunker = ChunkedDecoder()
+                body = dechunker.feed(body)
+            
+            data = bytearray(body)
+            while b"ENDSOURCETABLE" not in data and len(data) < limit:
+                body = sock.recv(65536)
+                if not body:
+                    break
+                if dechunker:
+                    body = dechunker.feed(body)
+                    if dechunker.finished and not body:
+                        break
+                data += body
+        
+        return data.decode("utf-8", errors="replace")
     
     def send_nmea(self, nmea_message):
         nmea = nmea_message + "\r\n"
-        self.socket.send(nmea.encode())
+        self.socket.sendall(nmea.encode())
     
-    def receive_rtcm(self):
-        return self.socket.recv(8192)
+    def receive_rtcm(self, size=8192):
+        """RTCM 바이트 (chunked면 디코딩 후), 연결 종료 시 b"" """
+        if self._pending:
+            data, self._pending = self._pending, b""
+            return data
+        
+        while True:
+            data = self.socket.recv(size)
+            if not data or self._dechunker is None:
+                return data
+            
+            data = self._dechunker.feed(data)
+            # 청크 헤더만 받은 경우는 다시 읽고, 마지막 청크면 종료로 처리
+            if data or self._dechunker.finished:
+                return data
     
     def close(self):
+        self.connected = False
+        self._dechunker = None
+        self._pending = b""
         if self.socket:
-            self.socket.close()
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+    
+    def _request(self):
+        msg = f"GET /{self.mount_point} HTTP/1.1\r\n"
+        msg += f"Host: {self.host_address}:{self.host_port}\r\n"
+        if self.ntrip_version >= 2:
+            msg += "Ntrip-Version: Ntrip/2.0\r\n"
+        msg += "User-Agent: NTRIP ntripclient\r\n"
+        msg += "Authorization: Basic " + self.auth + "\r\n"
+        msg += "Accept: */*\r\nConnection: close\r\n"
+        msg += "\r\n"
+        return msg
+    
+    def _read_header(self, sock, limit=16384):
+        """(헤더, 헤더 뒤에 같이 받은 본문) 반환
+        
+        Rev1은 "ICY 200 OK" 한 줄 뒤 바로 데이터가 올 수 있고,
+        Rev2/HTTP는 빈 줄로 헤더가 끝난다.
+        """
+        buf = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                if buf:
+                    return buf, b""
+                raise ConnectionError("connection closed before response")
+            buf += chunk
+            
+            if buf.startswith(b"ICY 200"):
+                end = buf.find(b"\r\n")
+                if end >= 0:
+                    body = buf[end + 2:]
+                    if body.startswith(b"\r\n"):
+                        body = body[2:]
+                    return buf[:end + 2], body
+            else:
+                end = buf.find(b"\r\n\r\n")
+                if end >= 0:
+                    return buf[:end + 4], buf[end + 4:]
+            
+            if len(buf) > limit:
+                raise ValueError("response header too long")
+    
+    @staticmethod
+    def _header_value(header, name):
+        for line in header.split("\r\n")[1:]:
+            key, sep, value = line.partition(":")
+            if sep and key.strip().lower() == name:
+                return value.strip().lower()
+        return None
 
 
 if __name__ == "__main__":
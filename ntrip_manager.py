@@ -1,44 +1,388 @@
+import socket
 import threading
 import time
 
+from reconnect_scheduler import ReconnectScheduler
+from rtcm_framer import RtcmFramer
+
+
+# 스트리밍 모드 연결 상태
+DISCONNECTED = "disconnected"
+CONNECTING = "connecting"
+CONNECTED = "connected"        # 응답 OK, 아직 데이터 없음 (VRS는 GGA 대기)
+STREAMING = "streaming"
+STALLED = "stalled"            # data_timeout 동안 데이터 없음 -> 재연결
+RECONNECTING = "reconnecting"  # 백오프 대기 중
+STOPPED = "stopped"
+
 
 class NtripManager:
+    """NTRIP 보정정보 중계
+    
+    streaming=True면 수신 스레드가 RTCM이 도착하는 즉시 센서로 전달하고,
+    GGA 업로드는 별도 스레드에서 gga_interval 주기로 보낸다. 연결이 끊기거나
+    data_timeout 동안 데이터가 없으면 지수 백오프 후 다시 연결하며 (백오프는 데이터가
+    stable_after초 이상 이어진 뒤에야 초기화), 상태가 바뀔 때마다
+    on_state_change(state, detail)를 호출한다 (수신 스레드에서 호출됨).
+    streaming=False면 기존처럼 1초마다 GGA 전송 -> RTCM 한 번 수신을 반복한다 (재연결은 같은 방식).
+    rtcm_framing=True면 CRC가 맞는 완성된 RTCM3 프레임만 전달한다.
+    caster(NtripCaster)를 주면 같은 프레임을 로컬 NTRIP 클라이언트에도 나눠준다.
+    연결, 소스테이블 조회(start_position)는 모두 start() 이후 수신 스레드에서 하므로
+    start()는 바로 반환한다.
+    gga_policy(GgaUplinkPolicy)를 주면 올릴 GGA 선택과 업로드 빈도는 정책이 정하고,
+    gga_interval은 정책을 확인하는 주기가 된다.
+    capture(RtcmCapture)를 주면 받은 원본 RTCM을 수신 시각과 함께 파일에 남긴다.
+    ntrip_client 자리에는 캡처 파일을 재생하는 ReplayClient도 쓸 수 있다.
+    """
     
-    def __init__(self, ntrip_client, sensor_client):
+    RECONNECT_KEY = "ntrip"
+    
+    def __init__(self, ntrip_client, sensor_client, streaming=True, gga_interval=1.0,
+                 read_timeout=1.0, rtcm_framing=True, data_timeout=10.0,
+                 mountpoint_selector=None, reselect_interval=30.0, caster=None,
+                 start_position=None, gga_policy=None, capture=None, stable_after=10.0):
         self.ntrip_client = ntrip_client
         self.sensor_client = sensor_client
+        self.caster = caster
+        self.capture = capture
+        self.streaming = streaming
+        self.gga_interval = gga_interval
+        self.gga_policy = gga_policy
+        self.read_timeout = read_timeout  # stop() 확인 주기 (수신 대기 최대 시간)
         self.running = False
         self.thread = None
+        self.gga_thread = None
+        self._stop_event = threading.Event()
+        self.framer = RtcmFramer() if rtcm_framing else None
+        
+        self.data_timeout = data_timeout
+        self.stable_after = stable_after
+        self.reconnect = ReconnectScheduler(base_delay=1.0, max_delay=60.0, max_in_flight=1)
+        self.state = CONNECTED if ntrip_client.connected else DISCONNECTED
+        self.last_error = None
+        self.on_state_change = None  # callback(state, detail)
+        self.connected_at = None
+        self._last_data_at = None
+        self._gga_since_connect = 0
+        self._stable = False  # 이번 연결에서 데이터가 stable_after초 이상 이어졌는지
+        
+        # 센서 위치가 reselect_distance 이상 바뀌면 소스테이블에서 마운트포인트 다시 선택
+        self.mountpoint_selector = mountpoint_selector
+        self.reselect_interval = reselect_interval
+        self._next_reselect = 0.0
+        self._next_mountpoint = None
+        self.start_position = start_position  # 첫 마운트포인트 선택에 쓸 (lat, lng)
+        
+        self.rtcm_bytes = 0
+        self.rtcm_chunks = 0
+        self.gga_sent = 0
+        self.last_rtcm_at = None   # 마지막 RTCM 수신 시각 (monotonic)
+        self.last_gga_at = None
     
     def start(self):
         if self.running:
             return
         
         self.running = True
-        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self._stop_event.clear()
+        
+        if not self.ntrip_client.connected:
+            self.reconnect.add(self.RECONNECT_KEY)
+        if self.streaming:
+            self.thread = threading.Thread(target=self._read_loop, daemon=True)
+            self.gga_thread = threading.Thread(target=self._gga_loop, daemon=True)
+            self.gga_thread.start()
+        else:
+            self.thread = threading.Thread(target=self._loop, daemon=True)
         self.thread.start()
         print("NTRIP Manager started")
     
     def stop(self):
         self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join(timeout=2.0)
+        if self.gga_thread:
+            self.gga_thread.join(timeout=2.0)
+        if self.streaming:
+            self.ntrip_client.close()
+            self._set_state(STOPPED)
+        if self.capture:
+            self.capture.close()
         print("NTRIP Manager stopped")
     
+    def correction_age(self):
+        """마지막으로 RTCM을 전달한 후 경과 시간(초), 아직 없으면 None"""
+        if self.last_rtcm_at is None:
+            return None
+        return time.monotonic() - self.last_rtcm_at
+    
+    def stats(self):
+        return {
+            "rtcm_bytes": self.rtcm_bytes,
+            "rtcm_chunks": self.rtcm_chunks,
+            "gga_sent": self.gga_sent,
+            "correction_age": self.correction_age(),
+            "rtcm": self.framer.stats() if self.framer else None,
+            "state": self.state,
+            "last_error": self.last_error,
+            "reconnect": self.reconnect.stats(self.RECONNECT_KEY),
+            "caster": self.caster.stats() if self.caster else None,
+            "gga_policy": self.gga_policy.stats() if self.gga_policy else None,
+        }
+    
+    def request_mountpoint(self, name):
+        """마운트포인트 변경 요청 (수신 스레드에서 다시 연결)"""
+        if name and name != self.ntrip_client.mount_point:
+            self._next_mountpoint = name
+    
+    def fleet_position(self):
+        """위치가 있는 센서들의 평균 (lat, lng), 없으면 None"""
+        _, records = self.sensor_client.state.snapshot()
+        positions = [r.position for r in records.values() if r.position]
+        if not positions:
+            return None
+        return (
+            sum(lat for _, lat in positions) / len(positions),
+            sum(lng for lng, _ in positions) / len(positions)
+        )
+    
+    def _set_state(self, state, detail=None):
+        if detail is not None:
+            self.last_error = detail
+        if state == self.state:
+            return
+        
+        self.state = state
+        print(f"NTRIP state: {state}" + (f" ({detail})" if detail else ""))
+        if self.on_state_change:
+            try:
+                self.on_state_change(state, detail)
+            except Exception as e:
+                print(f"NTRIP state callback error: {e}")
+    
+    def _forward_rtcm(self, rtcm_data):
+        self.rtcm_bytes += len(rtcm_data)
+        self.rtcm_chunks += 1
+        
+        if self.capture:
+            try:
+                self.capture.write(rtcm_data)
+            except OSError as e:
+                print(f"RTCM capture error: {e}")
+                self.capture = None
+        
+        if self.framer:
+            # 청크 경계에서 잘린 프레임은 다음 수신까지 보관
+            rtcm_data = self.framer.feed(rtcm_data)
+            if not rtcm_data:
+                return
+        
+        self.last_rtcm_at = time.monotonic()
+        self.sensor_client.send_rtcm(rtcm_data)
+        if self.caster:
+            self.caster.send_rtcm(rtcm_data)
+    
+    def _send_gga(self, force=False):
+        """force=True면 정책의 업로드 주기와 무관하게 현재 GGA를 올린다"""
+        if self.gga_policy:
+            nmea_message = self.gga_policy.next_gga(force=force)
+        else:
+            nmea_message = self.sensor_client.nmea_message
+        if not nmea_message:
+            return False
+        
+        self.ntrip_client.send_nmea(nmea_message)
+        self.gga_sent += 1
+        self._gga_since_connect += 1
+        self.last_gga_at = time.monotonic()
+        return True
+    
+    def _read_loop(self):
+        """연결/재연결을 관리하며 RTCM 수신 즉시 전달 (GGA 주기와 무관)"""
+        self._select_initial_mountpoint()
+        if self.ntrip_client.connected:
+            self._on_connected()
+        
+        while self.running:
+            if self._next_mountpoint:
+                self._switch_mountpoint()
+            
+            if not self.ntrip_client.connected:
+                self._connect()
+                continue
+            
+            try:
+                rtcm_data = self.ntrip_client.receive_rtcm()
+            except socket.timeout:
+                self._check_watchdog()
+                continue
+            except Exception as e:
+                if self.running:
+                    self._disconnect(f"receive error: {e}")
+                continue
+            
+            if not rtcm_data:
+                if self.running:
+                    self._disconnect("connection closed by server")
+                continue
+            
+            self._on_data()
+            try:
+                self._forward_rtcm(rtcm_data)
+            except Exception as e:
+                print(f"RTCM forward error: {e}")
+    
+    def _on_data(self):
+        now = time.monotonic()
+        self._last_data_at = now
+        if not self._stable and now - self.connected_at >= self.stable_after:
+            # 연결 직후 끊거나 멈추는 캐스터에 백오프가 매번 초기화되지 않도록 데이터가 이어진 뒤 초기화
+            self._stable = True
+            self.reconnect.on_connected(self.RECONNECT_KEY)
+        if self.state != STREAMING:
+            self._set_state(STREAMING)
+    
+    def _select_initial_mountpoint(self):
+        if self.mountpoint_selector is None or self.start_position is None:
+            return
+        if self.ntrip_client.connected:
+            return
+        
+        self._set_state(CONNECTING)
+        try:
+            mountpoint = self.mountpoint_selector.choose(*self.start_position)
+        except Exception as e:
+            print(f"NTRIP mountpoint selection error: {e}")
+            return
+        if mountpoint is not None:
+            print(f"Selected NTRIP mountpoint: {mountpoint.name}")
+            self.ntrip_client.mount_point = mountpoint.name
+    
+    def _connect(self):
+        """백오프 시간이 됐으면 연결 시도, 아니면 다음 시도까지 대기"""
+        if not self.reconnect.due():
+            self._stop_event.wait(self.reconnect.next_timeout())
+            return
+        
+        self._set_state(CONNECTING)
+        if not self.ntrip_client.connect():
+            self.reconnect.on_failure(self.RECONNECT_KEY, self.ntrip_client.last_error)
+            self._set_state(RECONNECTING, self.ntrip_client.last_error)
+            return
+        
+        self.reconnect.on_connected(self.RECONNECT_KEY, reset=False)
+        self._on_connected()
+        
+        # VRS 마운트포인트는 GGA를 받아야 데이터를 보내므로 바로 한 번 전송
+        try:
+            self._send_gga()
+        except Exception as e:
+            print(f"NTRIP GGA send error: {e}")
+    
+    def _on_connected(self):
+        try:
+            self.ntrip_client.socket.settimeout(self.read_timeout)
+        except Exception as e:
+            print(f"NTRIP socket setup error: {e}")
+        
+        if self.framer:
+            self.framer.reset()
+        self.connected_at = self._last_data_at = time.monotonic()
+        self._gga_since_connect = 0
+        self._stable = False
+        if self.gga_policy:
+            # 새 연결(마운트포인트가 바뀌었을 수 있음)에는 주기와 무관하게 바로 다시 올림
+            self.gga_policy.reset()
+        self._set_state(CONNECTED)
+    
+    def _check_watchdog(self):
+        # GGA를 보내기 전(위치 없음)에는 VRS가 데이터를 안 보낼 수 있으므로 제외
+        if self.state != STREAMING and not self._gga_since_connect:
+            return
+        
+        idle = time.monotonic() - self._last_data_at
+        if idle >= self.data_timeout:
+            self._set_state(STALLED, f"no data for {idle:.0f}s")
+            self._disconnect(f"no data for {idle:.0f}s")
+    
+    def _switch_mountpoint(self):
+        name, self._next_mountpoint = self._next_mountpoint, None
+        print(f"NTRIP mountpoint: {self.ntrip_client.mount_point} -> {name}")
+        
+        self.ntrip_client.close()
+        self.ntrip_client.mount_point = name
+        # 장애가 아니므로 백오프 없이 바로 연결
+        self.reconnect.add(self.RECONNECT_KEY)
+        self._set_state(RECONNECTING, f"mountpoint changed to {name}")
+    
+    def _check_mountpoint(self):
+        now = time.monotonic()
+        if self.mountpoint_selector is None or now < self._next_reselect:
+            return
+        self._next_reselect = now + self.reselect_interval
+        
+        position = self.fleet_position()
+        if position is None or not self.mountpoint_selector.needs_update(*position):
+            return
+        
+        mountpoint = self.mountpoint_selector.choose(*position)
+        if mountpoint is not None:
+            self.request_mountpoint(mountpoint.name)
+    
+    def _disconnect(self, error):
+        self.ntrip_client.close()
+        self.reconnect.add(self.RECONNECT_KEY)
+        self.reconnect.on_failure(self.RECONNECT_KEY, error)
+        self._set_state(RECONNECTING, error)
+    
+    def _gga_loop(self):
+        """gga_interval마다 최신 NMEA 업로드 (연결된 동안만)"""
+        while self.running:
+            if self.ntrip_client.connected:
+                try:
+                    self._send_gga()
+                except Exception as e:
+                    print(f"NTRIP GGA send error: {e}")
+            
+            try:
+                self._check_mountpoint()
+            except Exception as e:
+                print(f"NTRIP mountpoint selection error: {e}")
+            
+            self._stop_event.wait(self.gga_interval)
+    
     def _loop(self):
+        self._select_initial_mountpoint()
+        if self.ntrip_client.connected:
+            self._on_connected()
+        
         while self.running:
             try:
-                nmea_message = self.sensor_client.nmea_message
+                if not self.ntrip_client.connected:
+                    self._connect()
+                    continue
                 
-                if nmea_message:
-                    self.ntrip_client.send_nmea(nmea_message)
-                    rtcm_data = self.ntrip_client.receive_rtcm()
+                # 기존 방식은 GGA를 보낸 뒤에만 수신하므로 매번 올린다
+                if self._send_gga(force=True):
+                    try:
+                        rtcm_data = self.ntrip_client.receive_rtcm()
+                    except socket.timeout:
+                        rtcm_data = None
+                        self._check_watchdog()
                     
+                    if rtcm_data == b"":
+                        self._disconnect("connection closed by server")
+                        continue
                     if rtcm_data:
-                        self.sensor_client.send_rtcm(rtcm_data)
-                
-                time.sleep(1)
+                        self._on_data()
+                        self._forward_rtcm(rtcm_data)
                 
+                self._stop_event.wait(1)
+            
             except Exception as e:
                 print(f"NTRIP loop error: {e}")
-                time.sleep(5)
+                if self.running and self.ntrip_client.connected:
+                    self._disconnect(f"loop error: {e}")
+                else:
+                    self._stop_event.wait(5)
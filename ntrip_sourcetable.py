@@ -0,0 +1,201 @@
+import math
+import os
+import time
+from pathlib import Path
+
+
+CACHE_DIR = Path(__file__).resolve().parent / "cache"
+EARTH_RADIUS = 6371000.0
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """두 위경도 사이 거리 (m)"""
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Mountpoint:
+    """소스테이블 STR 레코드 하나"""
+    __slots__ = (
+        "name", "identifier", "format", "format_details", "carrier", "nav_system",
+        "network", "country", "lat", "lng", "nmea", "solution", "generator",
+        "compression", "authentication", "fee", "bitrate", "misc"
+    )
+    
+    def __init__(self, fields):
+        fields = list(fields) + [""] * (19 - len(fields))
+        self.name = fields[1]
+        self.identifier = fields[2]
+        self.format = fields[3]
+        self.format_details = fields[4]
+        self.carrier = fields[5]
+        self.nav_system = fields[6]
+        self.network = fields[7]
+        self.country = fields[8]
+        self.lat = _float(fields[9])
+        self.lng = _float(fields[10])
+        self.nmea = fields[11] == "1"          # 1이면 GGA를 보내야 함 (VRS 등)
+        self.solution = fields[12] == "1"      # 0: 단일 기준국, 1: 네트워크
+        self.generator = fields[13]
+        self.compression = fields[14]
+        self.authentication = fields[15]
+        self.fee = fields[16]
+        self.bitrate = _int(fields[17])
+        self.misc = ";".join(fields[18:]).rstrip(";")
+    
+    @property
+    def is_vrs(self):
+        return self.nmea and self.solution
+    
+    def is_rtcm3(self):
+        return self.format.replace(" ", "").upper().startswith("RTCM3")
+    
+    def distance_to(self, lat, lng):
+        if self.lat is None or self.lng is None:
+            return float("inf")
+        return haversine_m(self.lat, self.lng, lat, lng)
+    
+    def __repr__(self):
+        return f"Mountpoint({self.name}, {self.format}, {self.lat}, {self.lng}, vrs={self.is_vrs})"
+
+
+def _float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def parse_sourcetable(text):
+    """소스테이블 텍스트에서 STR 레코드 목록 (CAS/NET 레코드는 무시)"""
+    mountpoints = []
+    for line in text.splitlines():
+        if line.startswith("ENDSOURCETABLE"):
+            break
+        if not line.startswith("STR;"):
+            continue
+        fields = line.split(";")
+        if len(fields) >= 11 and fields[1]:
+            mountpoints.append(Mountpoint(fields))
+    return mountpoints
+
+
+def select_mountpoint(mountpoints, lat, lng, rtcm3_only=True, prefer_vrs=True, vrs_range=200000.0):
+    """위치에 가장 알맞은 마운트포인트
+    
+    prefer_vrs=True면 vrs_range(m) 안에 네트워크(VRS) 마운트포인트가 있을 때 그중
+    가장 가까운 것을, 없으면 가장 가까운 단일 기준국을 고른다.
+    """
+    candidates = [m for m in mountpoints if not rtcm3_only or m.is_rtcm3()]
+    if not candidates:
+        return None
+    
+    if prefer_vrs:
+        vrs = [m for m in candidates if m.is_vrs and m.distance_to(lat, lng) <= vrs_range]
+        if vrs:
+            return min(vrs, key=lambda m: m.distance_to(lat, lng))
+    
+    bases = [m for m in candidates if not m.is_vrs] or candidates
+    return min(bases, key=lambda m: m.distance_to(lat, lng))
+
+
+class SourcetableCache:
+    """캐스터별 소스테이블 텍스트를 디스크에 ttl(초) 동안 보관"""
+    
+    def __init__(self, cache_dir=CACHE_DIR, ttl=86400.0):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+    
+    def path(self, host, port):
+        safe_host = "".join(c if c.isalnum() or c in ".-" else "_" for c in str(host))
+        return self.cache_dir / f"sourcetable_{safe_host}_{port}.txt"
+    
+    def load(self, host, port, allow_expired=False):
+        path = self.path(host, port)
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age > self.ttl and not allow_expired:
+                return None
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+    
+    def save(self, host, port, text):
+        path = self.path(host, port)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Sourcetable cache write error: {e}")
+
+
+class MountpointSelector:
+    """소스테이블을 캐시에서 읽거나 받아와 센서 위치에 맞는 마운트포인트를 고른다
+    
+    choose()에 쓴 위치에서 reselect_distance(m) 이상 벗어나면 needs_update()가 True가 된다.
+    """
+    
+    def __init__(self, ntrip_client, cache=None, reselect_distance=5000.0, prefer_vrs=True,
+                 retry_interval=300.0):
+        self.ntrip_client = ntrip_client
+        self.cache = cache or SourcetableCache()
+        self.reselect_distance = reselect_distance
+        self.prefer_vrs = prefer_vrs
+        self.mountpoints = None
+        self.selected = None
+        self.position = None  # 마지막 선택에 쓴 (lat, lng)
+        self.retry_interval = retry_interval
+        self._reload_at = 0.0
+    
+    def load(self, force=False):
+        """마운트포인트 목록 (캐시가 만료됐으면 캐스터에서 다시 받음)"""
+        host = self.ntrip_client.host_address
+        port = self.ntrip_client.host_port
+        
+        text = None if force else self.cache.load(host, port)
+        if text is None:
+            try:
+                text = self.ntrip_client.fetch_sourcetable()
+                self.cache.save(host, port, text)
+            except (OSError, ValueError) as e:
+                print(f"Sourcetable fetch failed: {e}")
+                # 받아올 수 없으면 만료된 캐시라도 쓰고 retry_interval 뒤 다시 시도
+                self._reload_at = time.time() + self.retry_interval
+                text = self.cache.load(host, port, allow_expired=True)
+                if text is None:
+                    self.mountpoints = self.mountpoints or []
+                    return self.mountpoints
+                self.mountpoints = parse_sourcetable(text)
+                return self.mountpoints
+        
+        self.mountpoints = parse_sourcetable(text)
+        self._reload_at = time.time() + self.cache.ttl
+        return self.mountpoints
+    
+    def choose(self, lat, lng):
+        if self.mountpoints is None or time.time() >= self._reload_at:
+            self.load()
+        
+        self.position = (lat, lng)
+        selected = select_mountpoint(self.mountpoints or [], lat, lng, prefer_vrs=self.prefer_vrs)
+        if selected is not None:
+            self.selected = selected
+        return selected
+    
+    def needs_update(self, lat, lng):
+        if self.position is None:
+            return True
+        return haversine_m(self.position[0], self.position[1], lat, lng) >= self.reselect_distance
@@ -0,0 +1,123 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+
+HistorySlice = namedtuple("HistorySlice", ["t", "lng", "lat", "alt", "quality"])
+
+
+class PositionHistory:
+    """센서 하나의 위치 이력 링 버퍼 (열 단위 NumPy 배열)
+    
+    각 점을 i와 i + capacity 두 곳에 기록해 두므로, 마지막 capacity개 이내의
+    어떤 구간도 배열 하나의 연속 구간이 되어 복사 없이 view로 읽을 수 있다.
+    반환된 view는 그 뒤로 capacity번 append되기 전까지 유효하다.
+    """
+    
+    def __init__(self, capacity=3600):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        
+        self.capacity = capacity
+        size = capacity * 2
+        self._t = np.zeros(size, dtype=np.float64)
+        self._lng = np.zeros(size, dtype=np.float64)
+        self._lat = np.zeros(size, dtype=np.float64)
+        self._alt = np.zeros(size, dtype=np.float32)
+        self._quality = np.zeros(size, dtype=np.uint8)
+        self._head = 0   # 다음에 쓸 위치 (0 <= head < capacity)
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return self._count
+    
+    @property
+    def nbytes(self):
+        return (self._t.nbytes + self._lng.nbytes + self._lat.nbytes
+                + self._alt.nbytes + self._quality.nbytes)
+    
+    def append(self, timestamp, lng, lat, alt=float("nan"), quality=0):
+        with self._lock:
+            i = self._head
+            j = i + self.capacity
+            self._t[i] = self._t[j] = timestamp
+            self._lng[i] = self._lng[j] = lng
+            self._lat[i] = self._lat[j] = lat
+            self._alt[i] = self._alt[j] = alt
+            self._quality[i] = self._quality[j] = quality
+            
+            self._head = (i + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+    
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._count = 0
+    
+    def view(self):
+        """보관 중인 전체 이력 (오래된 것부터)"""
+        return self.last(self._count)
+    
+    def last(self, n):
+        """최근 n개 점"""
+        with self._lock:
+            n = max(0, min(n, self._count))
+            start = (self._head - n) % self.capacity
+            return self._slice(start, start + n)
+    
+    def window(self, start_time, end_time=None):
+        """start_time <= t <= end_time 구간 (타임스탬프는 증가 순서로 기록된다고 가정)"""
+        with self._lock:
+            start = (self._head - self._count) % self.capacity
+            stop = start + self._count
+            t = self._t[start:stop]
+            
+            lo = start + int(np.searchsorted(t, start_time, side="left"))
+            if end_time is None:
+                hi = stop
+            else:
+                hi = start + int(np.searchsorted(t, end_time, side="right"))
+            return self._slice(lo, max(lo, hi))
+    
+    def latest(self):
+        """(t, lng, lat, alt, quality) 또는 None"""
+        if not self._count:
+            return None
+        s = self.last(1)
+        return float(s.t[0]), float(s.lng[0]), float(s.lat[0]), float(s.alt[0]), int(s.quality[0])
+    
+    def _slice(self, start, stop):
+        return HistorySlice(
+            self._t[start:stop],
+            self._lng[start:stop],
+            self._lat[start:stop],
+            self._alt[start:stop],
+            self._quality[start:stop],
+        )
+
+
+class PositionHistoryStore:
+    """센서별 PositionHistory 모음, 센서당 메모리는 capacity로 고정된다"""
+    
+    def __init__(self, capacity=3600):
+        self.capacity = capacity
+        self._histories = {}
+    
+    def append(self, ip, timestamp, lng, lat, alt=float("nan"), quality=0):
+        history = self._histories.get(ip)
+        if history is None:
+            history = self._histories.setdefault(ip, PositionHistory(self.capacity))
+        history.append(timestamp, lng, lat, alt, quality)
+    
+    def get(self, ip):
+        return self._histories.get(ip)
+    
+    def remove(self, ip):
+        self._histories.pop(ip, None)
+    
+    @property
+    def nbytes(self):
+        return sum(history.nbytes for history in list(self._histories.values()))
@@ -0,0 +1,96 @@
+import time
+
+
+class PowerFrameDecoder:
+    """23번 포트 전원 상태 패킷(STX '00'|'01' ETX CR LF) 스트림 디코더
+    
+    상태를 바이트 단위로 유지하므로 TCP 세그먼트가 어디서 잘려도 이어서 해석한다.
+    """
+    
+    STX = 0x02
+    ETX = 0x03
+    CR = 0x0D
+    LF = 0x0A
+    
+    PAYLOADS = {b'01': True, b'00': False}
+    
+    _IDLE, _PAYLOAD, _ETX, _CR, _LF = range(5)
+    
+    def __init__(self):
+        self.state = self._IDLE
+        self.payload = bytearray()
+        self.frames = 0
+        self.malformed = 0
+    
+    def feed(self, data, timestamp=None):
+        """data를 해석해 [(power, timestamp), ...] 반환 (power: True/False)"""
+        if timestamp is None:
+            timestamp = time.time()
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        
+        results = []
+        i = 0
+        n = len(data)
+        
+        while i < n:
+            if self.state == self._IDLE:
+                # 프레임 밖의 잡음은 STX까지 한 번에 건너뜀
+                i = data.find(b'\x02', i)
+                if i < 0:
+                    break
+                self._start_frame()
+                i += 1
+                continue
+            
+            byte = data[i]
+            i += 1
+            
+            if self.state == self._PAYLOAD:
+                if byte == self.STX:
+                    self._fail()
+                    self._start_frame()
+                    continue
+                self.payload.append(byte)
+                if len(self.payload) == 2:
+                    self.state = self._ETX
+            elif self.state == self._ETX:
+                self._expect(byte, self.ETX, self._CR)
+            elif self.state == self._CR:
+                self._expect(byte, self.CR, self._LF)
+            elif self.state == self._LF:
+                if byte != self.LF:
+                    self._fail(byte)
+                    continue
+                
+                self.state = self._IDLE
+                power = self.PAYLOADS.get(bytes(self.payload))
+                if power is None:
+                    self.malformed += 1
+                else:
+                    self.frames += 1
+                    results.append((power, timestamp))
+        
+        return results
+    
+    def reset(self):
+        self.state = self._IDLE
+        self.payload.clear()
+    
+    def _start_frame(self):
+        self.state = self._PAYLOAD
+        self.payload.clear()
+    
+    def _expect(self, byte, expected, next_state):
+        if byte == expected:
+            self.state = next_state
+        else:
+            self._fail(byte)
+    
+    def _fail(self, byte=None):
+        self.malformed += 1
+        self.state = self._IDLE
+        # 트레일러 자리에 STX가 왔으면 새 프레임의 시작으로 취급
+        if byte == self.STX:
+            self._start_frame()
+
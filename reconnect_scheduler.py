@@ -0,0 +1,198 @@
+import random
+import threading
+import time
+from collections import deque
+
+
+class ReconnectState:
+    """소켓 하나(키: (ip, kind))의 재연결 상태"""
+    __slots__ = (
+        "key", "attempts", "failures", "next_attempt", "last_attempt",
+        "last_error", "in_flight", "connected", "slot", "queued"
+    )
+    
+    def __init__(self, key):
+        self.key = key
+        self.attempts = 0         # 전체 연결 시도 수
+        self.failures = 0         # 연속 실패 수 (연결 성공 시 0)
+        self.next_attempt = None  # 다음 시도 시각 (monotonic)
+        self.last_attempt = None
+        self.last_error = None
+        self.in_flight = False
+        self.connected = False
+        self.slot = None          # 타이머 휠 슬롯 번호
+        self.queued = False       # 시간이 됐지만 동시 연결 수 제한으로 대기 중
+
+
+class ReconnectScheduler:
+    """타이머 휠 기반 재연결 스케줄러
+    
+    실패할 때마다 base_delay * 2^(failures-1) (최대 max_delay)에 지터를 곱한 시간 뒤로
+    재시도를 미루고, 동시에 진행 중인 연결 시도는 max_in_flight개로 제한한다.
+    due()로 받은 키마다 연결을 시도한 뒤 on_connected() / on_failure()를 호출해야 한다.
+    """
+    
+    def __init__(self, base_delay=1.0, max_delay=60.0, jitter=0.5,
+                 max_in_flight=16, tick=0.1, slots=512, clock=time.monotonic):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_in_flight = max_in_flight
+        self.tick = tick
+        self.clock = clock
+        
+        self._lock = threading.Lock()
+        self._wheel = [{} for _ in range(slots)]  # 슬롯별 {key: deadline}
+        self._current_tick = int(clock() / tick)
+        self._ready = deque()
+        self._states = {}
+        self._scheduled = 0
+        self.in_flight = 0
+    
+    def add(self, key, delay=0.0):
+        """키를 등록하고 delay초 뒤 첫 시도를 예약 (이미 있으면 다시 예약)"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = ReconnectState(key)
+            if not state.in_flight:
+                self._insert(state, self.clock() + delay)
+    
+    def remove(self, key):
+        with self._lock:
+            state = self._states.pop(key, None)
+            if state is None:
+                return
+            self._unlink(state)
+            if state.in_flight:
+                self.in_flight -= 1
+    
+    def due(self, now=None):
+        """지금 시도할 키 목록 (동시 연결 수 제한 반영), 반환된 키는 in_flight 상태가 된다"""
+        with self._lock:
+            if now is None:
+                now = self.clock()
+            self._advance(now)
+            
+            keys = []
+            while self._ready and self.in_flight < self.max_in_flight:
+                state = self._states.get(self._ready.popleft())
+                if state is None or not state.queued:
+                    continue
+                
+                state.queued = False
+                state.in_flight = True
+                state.attempts += 1
+                state.last_attempt = now
+                state.next_attempt = None
+                self.in_flight += 1
+                keys.append(state.key)
+            return keys
+    
+    def on_connected(self, key, reset=True):
+        """연결 성공, reset=False면 연속 실패 수는 두고 in_flight만 해제 (나중에 on_connected로 초기화)"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            self._release(state)
+            state.connected = True
+            if reset:
+                state.failures = 0
+                state.last_error = None
+    
+    def on_failure(self, key, error=None):
+        """연결 실패 또는 끊김, 백오프 후 재시도 예약"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            self._release(state)
+            state.connected = False
+            state.failures += 1
+            if error is not None:
+                state.last_error = str(error)
+            self._insert(state, self.clock() + self.backoff(state.failures))
+    
+    def release(self, key):
+        """시도를 취소 (재시도 예약 없이 in_flight만 해제)"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._release(state)
+    
+    def backoff(self, failures):
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, failures - 1)))
+        # 같은 서브넷이 한꺼번에 끊겨도 재시도 시각이 겹치지 않도록 분산
+        return delay * random.uniform(1.0 - self.jitter, 1.0)
+    
+    def next_timeout(self, default=1.0):
+        """다음 due() 호출까지 기다릴 시간"""
+        if self._ready and self.in_flight < self.max_in_flight:
+            return 0.0
+        if self._scheduled:
+            return min(default, self.tick)
+        return default
+    
+    def stats(self, key):
+        state = self._states.get(key)
+        if state is None:
+            return None
+        
+        next_attempt = None
+        if state.next_attempt is not None:
+            next_attempt = time.time() + max(0.0, state.next_attempt - self.clock())
+        
+        return {
+            "attempts": state.attempts,
+            "failures": state.failures,
+            "next_attempt": next_attempt,
+            "last_error": state.last_error,
+            "in_flight": state.in_flight,
+            "connected": state.connected,
+        }
+    
+    def _release(self, state):
+        if state.in_flight:
+            state.in_flight = False
+            self.in_flight -= 1
+    
+    def _insert(self, state, deadline):
+        self._unlink(state)
+        tick = max(int(deadline / self.tick), self._current_tick)
+        slot = tick % len(self._wheel)
+        self._wheel[slot][state.key] = deadline
+        state.slot = slot
+        state.next_attempt = deadline
+        self._scheduled += 1
+    
+    def _unlink(self, state):
+        if state.slot is not None:
+            del self._wheel[state.slot][state.key]
+            state.slot = None
+            self._scheduled -= 1
+        state.queued = False
+    
+    def _advance(self, now):
+        target = int(now / self.tick)
+        slots = len(self._wheel)
+        
+        if target - self._current_tick >= slots:
+            indices = range(slots)
+        else:
+            indices = (t % slots for t in range(self._current_tick, target + 1))
+        
+        for index in indices:
+            bucket = self._wheel[index]
+            if not bucket:
+                continue
+            for key, deadline in list(bucket.items()):
+                if deadline <= now:
+                    state = self._states[key]
+                    del bucket[key]
+                    state.slot = None
+                    state.queued = True
+                    self._scheduled -= 1
+                    self._ready.append(key)
+        
+        self._current_tick = target
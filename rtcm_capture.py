@@ -0,0 +1,246 @@
+import os
+import socket
+import struct
+import threading
+import time
+
+
+MAGIC = b"RTCMCAP1"
+# 레코드: 수신 시각(unix, float64) + 길이(uint32) + 원본 바이트
+RECORD = struct.Struct("<dI")
+
+
+class RtcmCapture:
+    """NTRIP에서 받은 원본 RTCM을 수신 시각과 함께 파일 끝에 덧붙여 저장"""
+    
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self._flushed_at = time.monotonic()
+    
+    def write(self, data, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        
+        with self._lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD.pack(timestamp, len(data)))
+            self.file.write(data)
+            self.records += 1
+            self.bytes += len(data)
+            
+            now = time.monotonic()
+            if now - self._flushed_at >= self.flush_interval:
+                self.file.flush()
+                self._flushed_at = now
+    
+    def close(self):
+        with self._lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+
+def read_capture(path):
+    """캡처 파일의 (수신 시각, 바이트) 레코드를 차례로 반환 (끝이 잘린 레코드는 무시)"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"not an RTCM capture file: {path}")
+        
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            timestamp, length = RECORD.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, data
+
+
+class ReplayClient:
+    """캡처 파일을 원래 수신 간격대로(speed배속) 돌려주는 NtripClient 대체 객체
+    
+    connect()/receive_rtcm()/send_nmea()/close()를 NtripClient와 같은 방식으로 제공하므로
+    NtripManager에 그대로 넣을 수 있다. speed=0이면 대기 없이 바로 읽는다.
+    close() 후 다시 connect()하면(데이터 감시 재연결 등) 읽던 위치에서 이어서 재생한다.
+    파일 끝에서는 연결 종료(b"")를 돌려주고 finished를 set한다. 이후 connect()는 실패하므로
+    재연결해도 다시 재생되지 않는다. loop=True면 파일 끝에서만 처음부터 다시 재생한다.
+    """
+    
+    def __init__(self, path, speed=1.0, loop=False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.host_address = "replay"
+        self.host_port = 0
+        self.mount_point = os.path.basename(path)
+        
+        self.socket = None
+        self.connected = False
+        self.last_error = None
+        self.status = None
+        self.server_version = None
+        self.timeout = None
+        self.nmea_sent = 0
+        self._records = None
+        self._next = None
+        self._offset = 0.0  # 캡처 시각 -> 재생 시각(monotonic) 변환 값
+        self.finished = threading.Event()  # loop=False에서 파일 끝까지 재생함
+    
+    def connect(self):
+        self.close()
+        if self.finished.is_set():
+            self.last_error = "end of capture"
+            return False
+        
+        resume = self._next is not None
+        if not resume:
+            # 처음 연결하거나 loop로 파일 끝에 닿았을 때만 처음부터 다시 읽음
+            try:
+                self._rewind()
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                print(f"Failed to open RTCM capture: {e}")
+                return False
+            
+            if self._next is None:
+                self.last_error = "empty capture"
+                return False
+            
+            self._offset = time.monotonic() - self._next[0] / self.speed if self.speed else 0.0
+        # 이어서 재생할 때는 _offset을 그대로 두어 캡처의 수신 간격(끊김 포함)을 유지함
+        
+        # NtripManager는 수신 대기 시간을 socket.settimeout()으로 정하므로 자신을 socket으로 둔다
+        self.socket = self
+        self.connected = True
+        self.status = "REPLAY"
+        if resume:
+            print(f"Resuming RTCM capture: {self.path}")
+        else:
+            print(f"Replaying RTCM capture: {self.path} (x{self.speed})")
+        return True
+    
+    def _rewind(self):
+        self._next = None
+        if self._records is not None:
+            self._records.close()
+            self._records = None
+        self._records = read_capture(self.path)
+        self._next = next(self._records, None)
+    
+    def settimeout(self, timeout):
+        self.timeout = timeout
+    
+    def send_nmea(self, nmea_message):
+        if not self.connected:
+            raise OSError("replay not connected")
+        self.nmea_sent += 1
+    
+    def receive_rtcm(self, size=8192):
+        if self._next is None:
+            if not self.loop:
+                self.finished.set()
+                return b""
+            if not self.connect():
+                return b""
+        
+        timestamp, data = self._next
+        if self.speed:
+            delay = self._offset + timestamp / self.speed - time.monotonic()
+            if delay > 0:
+                if self.timeout is not None and delay > self.timeout:
+                    time.sleep(self.timeout)
+                    raise socket.timeout("timed out")
+                time.sleep(delay)
+        
+        self._next = next(self._records, None)
+        return data
+    
+    def fetch_sourcetable(self, limit=0):
+        return f"STR;{self.mount_point};replay;RTCM 3;;;;;;0.0;0.0;0;0;replay;none;N;N;0;\r\nENDSOURCETABLE\r\n"
+    
+    def close(self):
+        # 읽던 위치(_records/_next)는 남겨 두고 다음 connect()에서 이어서 재생함
+        self.connected = False
+        self.socket = None
+
+
+def main(argv=None):
+    import argparse
+    from ntrip_manager import NtripManager
+    
+    parser = argparse.ArgumentParser(description="Inspect or replay an RTCM capture file")
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (0 = as fast as possible)")
+    parser.add_argument("--info", action="store_true", help="print capture summary and exit")
+    parser.add_argument("--caster-port", type=int, default=None,
+                        help="serve the replay through a local NTRIP caster on this port")
+    parser.add_argument("--mount", default="REPLAY")
+    parser.add_argument("--loop", action="store_true")
+    args = parser.parse_args(argv)
+    
+    if args.info:
+        from rtcm_framer import RtcmFramer
+        framer = RtcmFramer(measure_latency=False)
+        first = last = None
+        records = 0
+        for timestamp, data in read_capture(args.path):
+            first = timestamp if first is None else first
+            last = timestamp
+            records += 1
+            framer.feed(data, timestamp)
+        stats = framer.stats()
+        duration = (last - first) if records else 0.0
+        print(f"records: {records}, duration: {duration:.1f}s, frames: {stats['frames']}, "
+              f"crc errors: {stats['crc_errors']}")
+        for msg_type, s in stats["types"].items():
+            print(f"  {msg_type}: {s['count']} frames, {s['bytes']} bytes")
+        return
+    
+    class _Sink:
+        # 캐스터 없이 재생할 때 프레이머 통계만 보기 위한 빈 센서 클라이언트
+        nmea_message = None
+        
+        def send_rtcm(self, rtcm_data):
+            pass
+    
+    caster = None
+    sink = _Sink()
+    if args.caster_port is not None:
+        from ntrip_caster import NtripCaster
+        caster = NtripCaster(host="127.0.0.1", port=args.caster_port, mountpoint=args.mount)
+        caster.start()
+        sink = caster
+    
+    client = ReplayClient(args.path, speed=args.speed, loop=args.loop)
+    manager = NtripManager(client, sink)
+    manager.start()
+    try:
+        while manager.running:
+            done = client.finished.wait(5.0)
+            stats = manager.stats()
+            print(f"state: {stats['state']}, bytes: {stats['rtcm_bytes']}, "
+                  f"frames: {stats['rtcm']['frames'] if stats['rtcm'] else '-'}")
+            if done:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+        if caster:
+            caster.stop()
+
+
+if __name__ == "__main__":
+    main()
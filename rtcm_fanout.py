@@ -0,0 +1,279 @@
+import selectors
+import socket
+import itertools
+import threading
+import time
+from collections import deque
+
+
+class RtcmQueue:
+    """센서 하나의 RTCM 송신 큐
+    
+    max_bytes를 넘으면 가장 오래된 프레임부터 버린다. 일부만 보낸 맨 앞 프레임은
+    버리면 스트림이 깨지므로 끝까지 보낸다.
+    """
+    __slots__ = (
+        "ip", "sock", "items", "offset", "queued_bytes", "max_bytes",
+        "sent_bytes", "sent_frames", "dropped_bytes", "dropped_frames",
+        "max_queued_bytes", "last_error"
+    )
+    
+    def __init__(self, ip, sock, max_bytes):
+        self.ip = ip
+        self.sock = sock
+        self.items = deque()
+        self.offset = 0            # 맨 앞 프레임에서 이미 보낸 바이트 수
+        self.queued_bytes = 0
+        self.max_bytes = max_bytes
+        self.sent_bytes = 0
+        self.sent_frames = 0
+        self.dropped_bytes = 0
+        self.dropped_frames = 0
+        self.max_queued_bytes = 0
+        self.last_error = None
+    
+    def push(self, frame):
+        self.items.append(frame)
+        self.queued_bytes += len(frame)
+        
+        while self.queued_bytes > self.max_bytes and len(self.items) > 1:
+            if self.offset:
+                dropped = self.items[1]
+                del self.items[1]
+            else:
+                dropped = self.items.popleft()
+            self.queued_bytes -= len(dropped)
+            self.dropped_bytes += len(dropped)
+            self.dropped_frames += 1
+        
+        if self.queued_bytes > self.max_queued_bytes:
+            self.max_queued_bytes = self.queued_bytes
+    
+    def write(self, once=False):
+        """보낼 수 있는 만큼 전송, 큐가 비면 True (소켓 오류는 OSError)
+        
+        once=True면 send()를 한 번만 호출한다. timeout이 설정된 소켓(스레드 모드)은
+        쓰기 가능 이벤트 직후의 첫 send()만 대기 없이 끝나기 때문이다.
+        """
+        while self.items:
+            data = self._gather()
+            try:
+                n = self.sock.send(data)
+            except (BlockingIOError, InterruptedError, socket.timeout):
+                return False
+            
+            self._consume(n)
+            if once or n < len(data):
+                break
+        return not self.items
+    
+    def _gather(self, limit=65536):
+        """맨 앞 프레임의 남은 부분부터 limit 바이트까지 이어 붙인 송신 데이터"""
+        head = memoryview(self.items[0])[self.offset:]
+        if len(self.items) == 1 or len(head) >= limit:
+            return head
+        
+        parts = [head]
+        size = len(head)
+        for frame in itertools.islice(self.items, 1, None):
+            if size + len(frame) > limit:
+                break
+            parts.append(frame)
+            size += len(frame)
+        return b"".join(parts)
+    
+    def _consume(self, n):
+        self.queued_bytes -= n
+        self.sent_bytes += n
+        items = self.items
+        while n:
+            remaining = len(items[0]) - self.offset
+            if n < remaining:
+                self.offset += n
+                return
+            n -= remaining
+            items.popleft()
+            self.offset = 0
+            self.sent_frames += 1
+    
+    def clear(self):
+        self.items.clear()
+        self.offset = 0
+        self.queued_bytes = 0
+    
+    def stats(self):
+        return {
+            "queued_bytes": self.queued_bytes,
+            "queued_frames": len(self.items),
+            "max_queued_bytes": self.max_queued_bytes,
+            "sent_bytes": self.sent_bytes,
+            "sent_frames": self.sent_frames,
+            "dropped_bytes": self.dropped_bytes,
+            "dropped_frames": self.dropped_frames,
+            "last_error": self.last_error,
+        }
+
+
+class RtcmFanout:
+    """RTCM 프레임을 연결된 모든 GPS 소켓으로 보내는 분배기
+    
+    publish()는 센서별 큐에 넣기만 하고 바로 반환하므로, 느린 센서 하나가
+    다른 센서의 보정정보 전송을 막지 않는다. 실제 전송은 write(ip)를 호출하는
+    SensorEventLoop 또는 start()로 띄운 전송 스레드(스레드 모드)가 한다.
+    set_filter()로 센서별 RtcmFilter를 주면 큐에 넣기 전에 프레임을 거른다.
+    """
+    
+    def __init__(self, max_queue_bytes=65536, on_pending=None):
+        self.max_queue_bytes = max_queue_bytes
+        self.on_pending = on_pending  # publish 후 호출 (이벤트 루프 깨우기용)
+        self.queues = {}  # {ip: RtcmQueue}
+        self.filters = {}  # {ip: RtcmFilter}, 재연결해도 유지
+        self._lock = threading.Lock()
+        self.running = False
+        self.thread = None
+    
+    def attach(self, ip, sock):
+        """GPS 소켓 연결 시 호출, 이전 연결의 큐는 버린다"""
+        with self._lock:
+            self.queues[ip] = RtcmQueue(ip, sock, self.max_queue_bytes)
+    
+    def detach(self, ip, sock=None):
+        with self._lock:
+            queue = self.queues.get(ip)
+            if queue is not None and (sock is None or queue.sock is sock):
+                del self.queues[ip]
+    
+    def set_filter(self, ip, rtcm_filter):
+        """센서 ip로 보낼 프레임 규칙 설정 (None이면 전체 전송)"""
+        with self._lock:
+            if rtcm_filter is None:
+                self.filters.pop(ip, None)
+            else:
+                self.filters[ip] = rtcm_filter
+    
+    def publish(self, frames):
+        """frames(bytes 또는 memoryview 목록)를 모든 센서 큐에 추가"""
+        with self._lock:
+            if not self.queues:
+                return
+            now = time.monotonic()
+            for ip, queue in self.queues.items():
+                rtcm_filter = self.filters.get(ip)
+                for frame in rtcm_filter.apply(frames, now) if rtcm_filter else frames:
+                    queue.push(frame)
+        
+        if self.running:
+            self._wakeup()
+        if self.on_pending:
+            self.on_pending()
+    
+    def pending(self, ip):
+        queue = self.queues.get(ip)
+        return bool(queue and queue.items)
+    
+    def pending_ips(self):
+        with self._lock:
+            return [ip for ip, queue in self.queues.items() if queue.items]
+    
+    def write(self, ip, once=False):
+        """ip의 큐를 가능한 만큼 전송, 다 보냈으면 True (소켓 오류는 OSError)"""
+        with self._lock:
+            queue = self.queues.get(ip)
+            if queue is None:
+                return True
+            try:
+                return queue.write(once)
+            except OSError as e:
+                queue.last_error = str(e)
+                queue.clear()
+                raise
+    
+    def stats(self, ip):
+        queue = self.queues.get(ip)
+        if queue is None:
+            return None
+        stats = queue.stats()
+        rtcm_filter = self.filters.get(ip)
+        stats["filter"] = rtcm_filter.stats() if rtcm_filter else None
+        return stats
+    
+    # ---- 스레드 모드 전송 ----
+    
+    def start(self):
+        if self.running:
+            return
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self.running = True
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout=2.0):
+        if not self.running:
+            return
+        self.running = False
+        self._wakeup()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+    
+    def _wakeup(self):
+        try:
+            self._wakeup_w.send(b"\x00")
+        except (AttributeError, BlockingIOError, OSError):
+            pass
+    
+    def _writer_loop(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+        registered = {}  # {ip: sock}
+        
+        try:
+            while self.running:
+                with self._lock:
+                    pending = {
+                        ip: queue.sock for ip, queue in self.queues.items() if queue.items
+                    }
+                
+                # 쓸 데이터가 있는 소켓만 쓰기 대기로 등록
+                for ip, sock in list(registered.items()):
+                    if pending.get(ip) is not sock:
+                        self._unregister(selector, sock)
+                        del registered[ip]
+                for ip, sock in pending.items():
+                    if ip not in registered:
+                        try:
+                            selector.register(sock, selectors.EVENT_WRITE, ip)
+                            registered[ip] = sock
+                        except (KeyError, ValueError, OSError):
+                            self.detach(ip, sock)
+                
+                for key, _ in selector.select(0.5):
+                    if key.data is None:
+                        self._drain_wakeup()
+                        continue
+                    try:
+                        self.write(key.data, once=True)
+                    except OSError as e:
+                        print(f"Error sending RTCM to {key.data}: {e}")
+                        self.detach(key.data, key.fileobj)
+        except Exception as e:
+            print(f"RTCM writer error: {e}")
+        finally:
+            selector.close()
+            self._wakeup_r.close()
+            self._wakeup_w.close()
+    
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+    
+    @staticmethod
+    def _unregister(selector, sock):
+        try:
+            selector.unregister(sock)
+        except (KeyError, ValueError, OSError):
+            pass
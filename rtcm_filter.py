@@ -0,0 +1,144 @@
+import time
+
+from rtcm_framer import message_type
+
+
+def _types(first, last):
+    return set(range(first, last + 1))
+
+
+# 설정에서 메시지 타입 대신 쓸 수 있는 이름
+GROUPS = {
+    "gps": _types(1001, 1004) | _types(1071, 1077) | {1019},
+    "glonass": _types(1009, 1012) | _types(1081, 1087) | {1020, 1230},
+    "galileo": _types(1091, 1097) | {1045, 1046},
+    "qzss": _types(1111, 1117) | {1044},
+    "bds": _types(1121, 1127) | {1042},
+    "station": _types(1005, 1008) | {1033},
+    "ephemeris": {1019, 1020, 1042, 1044, 1045, 1046},
+}
+
+MAX_FRAME_SIZE = 3 + 1023 + 3
+
+
+def parse_types(values):
+    """[1005, "1074-1077", "gps", ...] 형식을 메시지 타입 집합으로 변환"""
+    types = set()
+    for value in values or ():
+        if isinstance(value, int):
+            types.add(value)
+            continue
+        
+        text = str(value).strip().lower()
+        if text in GROUPS:
+            types |= GROUPS[text]
+        elif "-" in text:
+            first, _, last = text.partition("-")
+            types |= _types(int(first), int(last))
+        else:
+            types.add(int(text))
+    return types
+
+
+class RtcmFilter:
+    """센서 하나로 보낼 RTCM 프레임을 고르는 규칙
+    
+    allow가 있으면 그 타입만, deny에 있는 타입은 빼고 보낸다.
+    decimate({타입: 초})에 있는 타입은 그 간격에 한 번만 보낸다 (궤도력, 기준국 정보 등).
+    max_bytes_per_s를 주면 1초 분량까지 모아 쓸 수 있는 토큰 버킷으로 전송량을 제한한다.
+    프레임 단위로 판단하므로 rtcm_framing이 꺼져 있으면 SensorClient.send_rtcm이 먼저 프레임으로 나눈다.
+    """
+    
+    REASONS = ("type", "decimated", "budget")
+    
+    def __init__(self, allow=None, deny=None, decimate=None, max_bytes_per_s=None):
+        self.allow = set(allow) if allow else None
+        self.deny = set(deny or ())
+        self.decimate = dict(decimate or {})
+        self.max_bytes_per_s = max_bytes_per_s
+        
+        self._last_sent = {}  # {타입: 마지막 전송 시각}
+        self._capacity = max(max_bytes_per_s or 0, MAX_FRAME_SIZE)
+        self._tokens = self._capacity
+        self._refilled_at = None
+        
+        self.passed_frames = 0
+        self.passed_bytes = 0
+        self.saved_frames = dict.fromkeys(self.REASONS, 0)
+        self.saved_bytes = dict.fromkeys(self.REASONS, 0)
+    
+    @classmethod
+    def from_config(cls, config):
+        """{allow, deny, decimate, max_bytes_per_s} 설정 dict에서 생성
+        
+        decimate의 키도 타입 번호나 그룹 이름("ephemeris", "station")을 쓸 수 있다.
+        """
+        decimate = {}
+        for key, interval in (config.get("decimate") or {}).items():
+            for msg_type in parse_types([key]):
+                decimate[msg_type] = float(interval)
+        
+        return cls(
+            allow=parse_types(config.get("allow")),
+            deny=parse_types(config.get("deny")),
+            decimate=decimate,
+            max_bytes_per_s=config.get("max_bytes_per_s")
+        )
+    
+    def apply(self, frames, now=None):
+        """보낼 프레임 목록"""
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+        
+        passed = []
+        for frame in frames:
+            reason = self._check(frame, now)
+            size = len(frame)
+            if reason:
+                self.saved_frames[reason] += 1
+                self.saved_bytes[reason] += size
+                continue
+            
+            passed.append(frame)
+            self.passed_frames += 1
+            self.passed_bytes += size
+        return passed
+    
+    def _check(self, frame, now):
+        """프레임을 버릴 이유, 보내면 None"""
+        msg_type = message_type(frame)
+        if (self.allow is not None and msg_type not in self.allow) or msg_type in self.deny:
+            return "type"
+        
+        interval = self.decimate.get(msg_type)
+        if interval is not None:
+            last = self._last_sent.get(msg_type)
+            if last is not None and now - last < interval:
+                return "decimated"
+        
+        if self.max_bytes_per_s:
+            if self._tokens < len(frame):
+                return "budget"
+            self._tokens -= len(frame)
+        
+        if interval is not None:
+            self._last_sent[msg_type] = now
+        return None
+    
+    def _refill(self, now):
+        if not self.max_bytes_per_s:
+            return
+        if self._refilled_at is not None:
+            self._tokens = min(self._capacity, self._tokens + (now - self._refilled_at) * self.max_bytes_per_s)
+        self._refilled_at = now
+    
+    def stats(self):
+        total = self.passed_bytes + sum(self.saved_bytes.values())
+        return {
+            "passed_frames": self.passed_frames,
+            "passed_bytes": self.passed_bytes,
+            "saved_frames": dict(self.saved_frames),
+            "saved_bytes": dict(self.saved_bytes),
+            "saved_ratio": round(sum(self.saved_bytes.values()) / total, 3) if total else 0.0,
+        }
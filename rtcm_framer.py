@@ -0,0 +1,244 @@
+import time
+
+
+PREAMBLE = 0xD3
+HEADER_SIZE = 3
+CRC_SIZE = 3
+
+GPS_EPOCH_UNIX = 315964800   # 1980-01-06 00:00:00 UTC
+WEEK_MS = 604800 * 1000
+DAY_MS = 86400 * 1000
+
+
+def _crc24q_table():
+    table = []
+    for i in range(256):
+        crc = i << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1864CFB
+        table.append(crc & 0xFFFFFF)
+    return table
+
+
+_CRC24Q_TABLE = _crc24q_table()
+
+
+def crc24q(data, crc=0):
+    """RTCM3 CRC-24Q (Qualcomm, 다항식 0x1864CFB)"""
+    table = _CRC24Q_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFF) ^ table[(crc >> 16) ^ byte]
+    return crc
+
+
+def message_type(frame):
+    """프레임(헤더 포함)의 메시지 타입 (페이로드 앞 12비트)"""
+    if len(frame) < HEADER_SIZE + 2:
+        return None
+    return (frame[3] << 4) | (frame[4] >> 4)
+
+
+def _time_system(msg_type):
+    """메시지 타입의 epoch 시간 기준 ("gps", "bds", "glo", "glo_legacy") 또는 None"""
+    if 1001 <= msg_type <= 1004:
+        return "gps"
+    if 1009 <= msg_type <= 1012:
+        return "glo_legacy"
+    if 1071 <= msg_type <= 1127 and 1 <= msg_type % 10 <= 7:
+        system = msg_type // 10 * 10
+        if system in (1070, 1090, 1110):   # GPS, Galileo, QZSS (GPS 주 시간)
+            return "gps"
+        if system == 1120:
+            return "bds"
+        if system == 1080:
+            return "glo"
+    return None
+
+
+def epoch_latency(frame, now=None, leap_seconds=18):
+    """관측 메시지의 epoch 시각과 현재 시각 차이(초), epoch이 없는 메시지면 None
+    
+    MSM(1071~1127)과 기존 관측 메시지(1001~1004, 1009~1012)만 해당한다.
+    """
+    msg_type = message_type(frame)
+    system = _time_system(msg_type) if msg_type is not None else None
+    if system is None or len(frame) < HEADER_SIZE + 8:
+        return None
+    
+    if now is None:
+        now = time.time()
+    
+    # 타입 12비트 + 기준국 ID 12비트 뒤에 epoch
+    bits = int.from_bytes(frame[HEADER_SIZE:HEADER_SIZE + 8], "big")
+    gps_ms = int((now - GPS_EPOCH_UNIX + leap_seconds) * 1000)
+    
+    if system == "gps":
+        epoch = (bits >> 10) & 0x3FFFFFFF
+        current, period = gps_ms % WEEK_MS, WEEK_MS
+    elif system == "bds":
+        epoch = (bits >> 10) & 0x3FFFFFFF
+        current, period = (gps_ms - 14000) % WEEK_MS, WEEK_MS
+    else:
+        # GLONASS: 모스크바 시간(UTC+3) 기준 하루 중 ms
+        if system == "glo":
+            epoch = (bits >> 10) & 0x7FFFFFF
+        else:
+            epoch = (bits >> 13) & 0x7FFFFFF
+        current, period = int((now + 3 * 3600) * 1000) % DAY_MS, DAY_MS
+    
+    latency = (current - epoch) % period
+    if latency > period // 2:
+        latency -= period
+    return latency / 1000.0
+
+
+class RtcmTypeStats:
+    __slots__ = ("count", "bytes", "latency_sum", "latency_count", "last_latency", "last_at")
+    
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.last_latency = None
+        self.last_at = None
+
+
+class RtcmFramer:
+    """스트림에서 RTCM3 프레임(0xD3 + 10비트 길이 + 페이로드 + CRC24Q)을 잘라내는 프레이머
+    
+    feed()는 CRC가 맞는 프레임 전체(헤더~CRC)를 memoryview로 반환한다.
+    view는 읽기 전용 bytes를 가리키므로 버퍼 재사용과 무관하게 계속 유효하다.
+    CRC가 틀리면 1바이트 건너뛰고 다음 0xD3부터 다시 찾는다.
+    """
+    
+    def __init__(self, measure_latency=True, leap_seconds=18):
+        self.measure_latency = measure_latency
+        self.leap_seconds = leap_seconds
+        self._pending = b""
+        self.frames = 0
+        self.crc_errors = 0
+        self.dropped_bytes = 0
+        self.types = {}  # {메시지 타입: RtcmTypeStats}
+        self.started_at = time.monotonic()
+    
+    def feed(self, data, now=None):
+        """data를 추가하고 완성된 프레임 memoryview 목록 반환"""
+        if now is None:
+            now = time.time()
+        
+        buf = self._pending + bytes(data) if self._pending else bytes(data)
+        view = memoryview(buf)
+        size = len(buf)
+        frames = []
+        pos = 0
+        
+        while True:
+            start = buf.find(PREAMBLE, pos)
+            if start < 0:
+                self.dropped_bytes += size - pos
+                pos = size
+                break
+            self.dropped_bytes += start - pos
+            pos = start
+            
+            if size - pos < HEADER_SIZE:
+                break
+            
+            # 상위 6비트는 예약(0), 하위 10비트가 페이로드 길이
+            if buf[pos + 1] & 0xFC:
+                self.dropped_bytes += 1
+                pos += 1
+                continue
+            
+            length = ((buf[pos + 1] & 0x03) << 8) | buf[pos + 2]
+            end = pos + HEADER_SIZE + length + CRC_SIZE
+            if end > size:
+                break
+            
+            frame = view[pos:end]
+            if crc24q(frame[:-CRC_SIZE]) != int.from_bytes(frame[-CRC_SIZE:], "big"):
+                self.crc_errors += 1
+                self.dropped_bytes += 1
+                pos += 1
+                continue
+            
+            frames.append(frame)
+            self._count(frame, now)
+            pos = end
+        
+        self._pending = buf[pos:] if pos < size else b""
+        return frames
+    
+    def reset(self):
+        self._pending = b""
+    
+    def reset_stats(self):
+        self.frames = 0
+        self.crc_errors = 0
+        self.dropped_bytes = 0
+        self.types = {}
+        self.started_at = time.monotonic()
+    
+    def _count(self, frame, now):
+        self.frames += 1
+        msg_type = message_type(frame)
+        stats = self.types.get(msg_type)
+        if stats is None:
+            stats = self.types[msg_type] = RtcmTypeStats()
+        
+        stats.count += 1
+        stats.bytes += len(frame)
+        stats.last_at = now
+        
+        if self.measure_latency:
+            latency = epoch_latency(frame, now, self.leap_seconds)
+            if latency is not None:
+                stats.latency_sum += latency
+                stats.latency_count += 1
+                stats.last_latency = latency
+    
+    def stats(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        types = {}
+        for msg_type, s in sorted(self.types.items()):
+            types[msg_type] = {
+                "count": s.count,
+                "bytes": s.bytes,
+                "rate_hz": round(s.count / elapsed, 3),
+                "bytes_per_s": round(s.bytes / elapsed, 1),
+                "latency_avg": round(s.latency_sum / s.latency_count, 3) if s.latency_count else None,
+                "latency_last": round(s.last_latency, 3) if s.last_latency is not None else None,
+            }
+        
+        return {
+            "frames": self.frames,
+            "crc_errors": self.crc_errors,
+            "dropped_bytes": self.dropped_bytes,
+            "bytes_per_s": round(sum(s.bytes for s in self.types.values()) / elapsed, 1),
+            "types": types,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) < 2:
+        print("usage: python rtcm_framer.py <rtcm_capture_file>")
+        sys.exit(1)
+    
+    framer = RtcmFramer(measure_latency=False)
+    with open(sys.argv[1], "rb") as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            framer.feed(chunk)
+    
+    stats = framer.stats()
+    print(f"frames: {stats['frames']}, crc errors: {stats['crc_errors']}, "
+          f"dropped bytes: {stats['dropped_bytes']}")
+    for msg_type, s in stats["types"].items():
+        print(f"  {msg_type}: {s['count']} frames, {s['bytes']} bytes")
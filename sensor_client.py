@@ -2,25 +2,67 @@ import socket
 import threading
 import time
 
+from nmea_framer import NmeaFramer
+from nmea_parser import NmeaParser
+from power_decoder import PowerFrameDecoder
+from reconnect_scheduler import ReconnectScheduler
+from rtcm_fanout import RtcmFanout
+from rtcm_filter import RtcmFilter
+from rtcm_framer import RtcmFramer
+from sensor_descriptor import SensorDescriptor
+from sensor_loop import SensorEventLoop
+from sensor_state import SensorStateStore
+
+try:
+    from position_history import PositionHistoryStore
+except ImportError:  # numpy 없으면 위치 이력 없이 동작
+    PositionHistoryStore = None
+
 
 class SensorClient:
     
+    # 디스크립터에 포트를 지정하지 않은 센서의 기본 포트
     POWER_PORT = 23
     GPS_PORT = 24
     
-    def __init__(self):
+    _KIND_LABELS = {"power": "Power", "gps": "GPS"}
+    
+    def __init__(self, use_event_loop=False, history_capacity=3600, rtcm_queue_bytes=65536,
+                 rtcm_filter=None):
         self.sensors = {}
+        self.descriptors = {}  # {ip: SensorDescriptor}, 센서별 호스트/포트/전송 방식
+        self.state = SensorStateStore()  # UI는 dict 대신 이 저장소의 스냅샷을 읽음
         self.power_status = {}
+        self.power_changed_at = {}  # {ip: 마지막 전원 상태 변화 수신 시각}
+        self.power_errors = {}  # {ip: 잘못된 전원 패킷 수}
         self.gps_data = {}
+        self.gps_fixes = {}  # {ip: 마지막 GGA NmeaFix}
+        # 센서별 위치 이력 (센서당 history_capacity개 고정 크기)
+        self.history = PositionHistoryStore(history_capacity) if PositionHistoryStore else None
+        self.nmea_parsers = {}  # {ip: NmeaParser}, 센서별 체크섬/형식 오류 통계
         self.rtk_status = {}
         self.power_sockets = {}
         self.gps_sockets = {}
         self.nmea_message = None
+        self.on_power_change = None  # callback(ip, power, timestamp), 수신 스레드에서 호출
         self.running = False
         self.threads = []
         
-        self.reconnect_timers = {}  # {ip: {"power": time, "gps": time}}
-        self.reconnect_interval = 5.0
+        # (ip, kind)별 지수 백오프 + 지터, 동시 연결 시도 수 제한
+        self.connect_timeout = 5.0
+        self.reconnect = ReconnectScheduler(base_delay=1.0, max_delay=60.0, max_in_flight=32)
+        
+        # True면 스레드 대신 하나의 selectors 루프에서 모든 소켓 처리
+        self.use_event_loop = use_event_loop
+        self.event_loop = None
+        self._power_decoders = {}
+        
+        # RTCM은 센서별 송신 큐(초과 시 오래된 프레임부터 버림)를 거쳐 non-blocking으로 전송
+        self.rtcm_fanout = RtcmFanout(max_queue_bytes=rtcm_queue_bytes)
+        # 디스크립터에 rtcm 규칙이 없는 센서에 쓸 기본 규칙 (RtcmFilter.from_config 형식)
+        self.rtcm_filter = rtcm_filter
+        self._rtcm_framer = None  # 프레임으로 나뉘지 않은 RTCM을 규칙 적용 전에 나눌 때 사용
+        self._gps_framers = {}
         
         # 임시 GPS 데이터 (기본 위치 주변)
         self.mock_gps_data = {
@@ -29,9 +71,52 @@ class SensorClient:
             "192.168.119.3": (126.714658, 37.336942)
         }
     
-    def add_sensor(self, ip, channel):
+    def add_sensor(self, ip, channel, descriptor=None):
+        """센서 추가, descriptor가 없으면 ip("host" 또는 "host:power_port:gps_port")에서 생성"""
+        if descriptor is None:
+            descriptor = SensorDescriptor.parse(ip, self.POWER_PORT, self.GPS_PORT)
+        
+        self.descriptors[ip] = descriptor
         self.sensors[ip] = channel
-        self.reconnect_timers[ip] = {"power": 0, "gps": 0}
+        self.state.add(ip, channel)
+        
+        filter_config = descriptor.rtcm_filter or self.rtcm_filter
+        if filter_config:
+            try:
+                self.rtcm_fanout.set_filter(ip, RtcmFilter.from_config(filter_config))
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"Invalid RTCM filter for {ip}: {e}, sending all messages")
+    
+    def sensor_address(self, ip, kind):
+        """센서 채널(kind: "power"/"gps")의 접속 주소 (host, port)"""
+        descriptor = self.descriptors.get(ip)
+        if descriptor is None:
+            return (ip, self.POWER_PORT if kind == "power" else self.GPS_PORT)
+        return descriptor.address(kind)
+    
+    def connect_sensor(self, ip, channel):
+        """실행 중에 추가된 센서 연결 시작"""
+        if not self.running:
+            # 센서 없이 시작해 start()가 호출되지 않은 경우, start()가 이 센서를 포함해 연결을 예약
+            self.start()
+            return
+        
+        self.reconnect.add((ip, "power"))
+        self.reconnect.add((ip, "gps"))
+        
+        if self.event_loop:
+            self.event_loop.wakeup()
+    
+    def reconnect_status(self, ip):
+        """{"power": {...}, "gps": {...}} 재연결 횟수, 다음 시도 시각, 마지막 오류"""
+        return {
+            kind: self.reconnect.stats((ip, kind))
+            for kind in self._KIND_LABELS
+        }
+    
+    def rtcm_status(self, ip):
+        """RTCM 송신 큐 깊이, 전송/버린 바이트 수, 필터로 줄인 바이트 수 (GPS 소켓 미연결 시 None)"""
+        return self.rtcm_fanout.stats(ip)
     
     def remove_sensor(self, ip):
         print(f"Removing sensor: {ip}")
@@ -39,10 +124,19 @@ class SensorClient:
         if ip in self.sensors:
             del self.sensors[ip]
         
-        if ip in self.reconnect_timers:
-            del self.reconnect_timers[ip]
+        self.descriptors.pop(ip, None)
+        self.state.remove(ip)
+        
+        self.reconnect.remove((ip, "power"))
+        self.reconnect.remove((ip, "gps"))
+        self.rtcm_fanout.detach(ip)
+        self.rtcm_fanout.set_filter(ip, None)
         
-        if ip in self.power_sockets:
+        if self.event_loop:
+            # 소켓은 루프 스레드가 소유하므로 닫기도 루프에서 처리
+            self.event_loop.close_sensor(ip)
+        
+        if not self.event_loop and ip in self.power_sockets:
             try:
                 self.power_sockets[ip].shutdown(socket.SHUT_RDWR)
                 self.power_sockets[ip].close()
@@ -50,7 +144,7 @@ class SensorClient:
                 pass
             del self.power_sockets[ip]
         
-        if ip in self.gps_sockets:
+        if not self.event_loop and ip in self.gps_sockets:
             try:
                 self.gps_sockets[ip].shutdown(socket.SHUT_RDWR)
                 self.gps_sockets[ip].close()
@@ -61,9 +155,17 @@ class SensorClient:
         if ip in self.power_status:
             del self.power_status[ip]
         
+        self.power_changed_at.pop(ip, None)
+        self.power_errors.pop(ip, None)
+        
         if ip in self.gps_data:
             del self.gps_data[ip]
         
+        self.gps_fixes.pop(ip, None)
+        self.nmea_parsers.pop(ip, None)
+        if self.history:
+            self.history.remove(ip)
+        
         if ip in self.rtk_status:
             del self.rtk_status[ip]
     
@@ -87,24 +189,18 @@ class SensorClient:
                 if self.on_gps_update:
                     lng, lat = self.mock_gps_data[ip]
                     self.on_gps_update(ip, lng, lat)"""
-                    
-            # 실제 연결 시도
-            power_thread = threading.Thread(
-                target=self._connect_power_socket, 
-                args=(ip, channel),
-                daemon=True
-            )
-            gps_thread = threading.Thread(
-                target=self._connect_gps_socket, 
-                args=(ip, channel),
-                daemon=True
-            )
-            
-            power_thread.start()
-            gps_thread.start()
             
-            self.threads.append(power_thread)
-            self.threads.append(gps_thread)
+            # 실제 연결 시도는 재연결 스케줄러가 동시 연결 수 제한 안에서 진행
+            self.reconnect.add((ip, "power"))
+            self.reconnect.add((ip, "gps"))
+        
+        if self.use_event_loop:
+            self.event_loop = SensorEventLoop(self, connect_timeout=self.connect_timeout)
+            self.rtcm_fanout.on_pending = self.event_loop.schedule_rtcm_flush
+            self.event_loop.start()
+            return
+        
+        self.rtcm_fanout.start()
         
         reconnect_thread = threading.Thread(
             target=self._reconnect_loop,
@@ -116,6 +212,15 @@ class SensorClient:
     def stop(self):
         self.running = False
         
+        if self.event_loop:
+            # 루프 스레드 하나만 종료하면 되므로 센서 수와 무관하게 종료
+            self.rtcm_fanout.on_pending = None
+            self.event_loop.stop()
+            self.event_loop = None
+            return
+        
+        self.rtcm_fanout.stop()
+        
         for sock in list(self.power_sockets.values()):
             try:
                 sock.close()
@@ -133,64 +238,56 @@ class SensorClient:
     
     def _reconnect_loop(self):
         while self.running:
-            current_time = time.time()
-            
-            for ip, channel in list(self.sensors.items()):
-                if ip not in self.sensors:
+            for ip, kind in self.reconnect.due():
+                channel = self.sensors.get(ip)
+                if channel is None:
+                    self.reconnect.remove((ip, kind))
                     continue
                 
-                if self.power_status.get(ip) is None:
-                    if current_time - self.reconnect_timers[ip]["power"] >= self.reconnect_interval:
-                        print(f"Attempting to reconnect power socket: {ip}")
-                        self.reconnect_timers[ip]["power"] = current_time
-                        
-                        thread = threading.Thread(
-                            target=self._connect_power_socket,
-                            args=(ip, channel),
-                            daemon=True
-                        )
-                        thread.start()
-                
-                if ip not in self.gps_sockets:
-                    if current_time - self.reconnect_timers[ip]["gps"] >= self.reconnect_interval:
-                        print(f"Attempting to reconnect GPS socket: {ip}")
-                        self.reconnect_timers[ip]["gps"] = current_time
-                        
-                        thread = threading.Thread(
-                            target=self._connect_gps_socket,
-                            args=(ip, channel),
-                            daemon=True
-                        )
-                        thread.start()
+                target = self._connect_power_socket if kind == "power" else self._connect_gps_socket
+                thread = threading.Thread(
+                    target=target,
+                    args=(ip, channel),
+                    daemon=True
+                )
+                thread.start()
             
-            time.sleep(1.0)
+            time.sleep(self.reconnect.next_timeout())
+    
+    def _connection_finished(self, ip, kind, error):
+        """스레드 모드 연결 종료 처리, 센서가 남아 있으면 백오프 후 재연결 예약"""
+        if self.running and ip in self.sensors:
+            self.reconnect.on_failure((ip, kind), error or "connection closed")
+        else:
+            self.reconnect.release((ip, kind))
     
     def _connect_power_socket(self, ip, channel):
-        print(f"Connecting to power socket: {ip}:{self.POWER_PORT}")
+        address = self.sensor_address(ip, "power")
+        print(f"Connecting to power socket: {address[0]}:{address[1]}")
         
         sock = None
+        error = None
         try:
             sock = socket.socket()
-            sock.settimeout(5.0)
-            sock.connect((ip, self.POWER_PORT))
+            sock.settimeout(self.connect_timeout)
+            sock.connect(address)
             connect_msg = sock.recv(20)
             print(f"Power socket connected: {ip} - {connect_msg}")
             
-            if ip in self.reconnect_timers:
-                self.reconnect_timers[ip]["power"] = time.time()
+            self.reconnect.on_connected((ip, "power"))
             
             self.power_sockets[ip] = sock
             
             self._receive_power_data(sock, ip)
-            
-        except socket.timeout:
+        
+        except socket.timeout as e:
             print(f"Power socket connection timeout: {ip}")
-            if ip in self.sensors:
-                self.power_status[ip] = None
+            self._set_power_lost(ip)
+            error = e
         except Exception as e:
             print(f"Power socket error ({ip}): {e}")
-            if ip in self.sensors:
-                self.power_status[ip] = None
+            self._set_power_lost(ip)
+            error = e
         finally:
             if ip in self.power_sockets:
                 del self.power_sockets[ip]
@@ -199,29 +296,36 @@ class SensorClient:
                     sock.close()
                 except:
                     pass
+            self._connection_finished(ip, "power", error)
     
     def _connect_gps_socket(self, ip, channel):
-        print(f"Connecting to GPS socket: {ip}:{self.GPS_PORT}")
+        address = self.sensor_address(ip, "gps")
+        print(f"Connecting to GPS socket: {address[0]}:{address[1]}")
         
         sock = None
+        error = None
         try:
             sock = socket.socket()
-            sock.settimeout(5.0)
-            sock.connect((ip, self.GPS_PORT))
+            sock.settimeout(self.connect_timeout)
+            sock.connect(address)
             connect_msg = sock.recv(20)
             print(f"GPS socket connected: {ip} - {connect_msg}")
             
-            if ip in self.reconnect_timers:
-                self.reconnect_timers[ip]["gps"] = time.time()
+            self.reconnect.on_connected((ip, "gps"))
             
             self.gps_sockets[ip] = sock
+            self.rtcm_fanout.attach(ip, sock)
             self._receive_gps_data(sock, ip)
-            
-        except socket.timeout:
+        
+        except socket.timeout as e:
             print(f"GPS socket connection timeout: {ip}")
+            error = e
         except Exception as e:
             print(f"GPS socket error ({ip}): {e}")
+            error = e
         finally:
+            if sock:
+                self.rtcm_fanout.detach(ip, sock)
             if ip in self.gps_sockets:
                 del self.gps_sockets[ip]
             if sock:
@@ -229,113 +333,173 @@ class SensorClient:
                     sock.close()
                 except:
                     pass
+            self._connection_finished(ip, "gps", error)
     
     def _receive_power_data(self, sock, ip):
-        P_STX = b'\x02'
+        decoder = PowerFrameDecoder()
         
         while self.running and ip in self.sensors:
             try:
-                byte = sock.recv(1)
+                data = sock.recv(4096)
                 
-                if not byte:
+                if not data:
                     print(f"Power socket closed: {ip}")
-                    self.power_status[ip] = None
+                    self._set_power_lost(ip)
                     break
                 
-                if byte == P_STX:
-                    data = sock.recv(2)
-                    sock.recv(3)
-                    
-                    if data == b'01':
-                        power = True
-                        # print(f"Power ON received from {ip}")
-                    elif data == b'00':
-                        power = False
-                        # print(f"Power OFF received from {ip}")
-                    else:
-                        continue
-                    
-                    self.power_status[ip] = power
+                self._feed_power_data(ip, decoder, data)
 
-                    # 임시 데이터
-                    """self.power_status["192.168.123.1"] = True
-                    self.power_status["192.168.123.2"] = False
-                    self.power_status["192.168.123.3"] = None"""
-                
-                time.sleep(0.1)
+                # 임시 데이터
+                """self.power_status["192.168.123.1"] = True
+                self.power_status["192.168.123.2"] = False
+                self.power_status["192.168.123.3"] = None"""
                 
             except socket.timeout:
                 continue
             except Exception as e:
                 print(f"Power receive error ({ip}): {e}")
-                self.power_status[ip] = None
+                self._set_power_lost(ip)
                 break
     
     def _receive_gps_data(self, sock, ip):
-        G_STX = b'$'
+        framer = NmeaFramer()
         
         while self.running and ip in self.sensors:
             try:
-                byte = sock.recv(1)
+                sentences = framer.read_from(sock)
                 
-                if not byte:
+                if sentences is None:
                     print(f"GPS socket closed: {ip}")
                     break
                 
-                if byte == G_STX:
-                    packet = byte
-                    while True:
-                        packet += sock.recv(1)
-                        if packet[-2:] == b'\r\n':
-                            break
-                    
-                    data = packet.decode('utf-8', errors='ignore')
-                    print(data)
-                    fields = data.split(',')
-                    
-                    self.nmea_message = data.strip()
-                    
-                    if data.startswith('$GPGGA') or data.startswith('$GNGGA'):
-                        if len(fields) >= 7:
-                            try:
-                                lat = self._nmea_to_decimal(fields[2])
-                                lng = self._nmea_to_decimal(fields[4])
-                                self.gps_data[ip] = (lng, lat)
-                                
-                                quality = int(fields[6]) if fields[6] else 0
-                                
-                                # quality: 0=No fix, 1=GPS, 2=DGPS, 4=RTK fixed, 5=RTK float
-                                if quality == 4:
-                                    self.rtk_status[ip] = 'fixed'
-                                    print(f"RTK Fixed: {ip}, lng: {lng}, lat: {lat}")
-                                elif quality == 5:
-                                    self.rtk_status[ip] = 'float'
-                                    print(f"RTK Float: {ip}, lng: {lng}, lat: {lat}")
-                                else:
-                                    self.rtk_status[ip] = 'none'
-                                    print(f"RTK None: {ip}, lng: {lng}, lat: {lat}")
-                                
-                            except (ValueError, IndexError) as e:
-                                print(f"GPS parse error ({ip}): {e}")
-                    
-                    time.sleep(0.1)
+                for sentence in sentences:
+                    self._handle_nmea_sentence(ip, sentence)
                     
             except socket.timeout:
                 continue
             except Exception as e:
                 print(f"GPS receive error ({ip}): {e}")
                 break
+    
+    def _feed_power_data(self, ip, decoder, data):
+        timestamp = time.time()
+        malformed = decoder.malformed
+        
+        for power, received_at in decoder.feed(data, timestamp):
+            self._handle_power_frame(ip, power, received_at)
+        
+        if decoder.malformed != malformed:
+            self.power_errors[ip] = self.power_errors.get(ip, 0) + decoder.malformed - malformed
+    
+    def _handle_power_frame(self, ip, power, timestamp):
+        previous = self.power_status.get(ip)
+        self.power_status[ip] = power
+        
+        if previous != power:
+            # print(f"Power {'ON' if power else 'OFF'} received from {ip}")
+            self.power_changed_at[ip] = timestamp
+            self.state.update(ip, power=power, power_changed_at=timestamp)
+            if self.on_power_change:
+                self.on_power_change(ip, power, timestamp)
+    
+    def _set_power_lost(self, ip):
+        if ip in self.sensors:
+            self.power_status[ip] = None
+            self.state.update(ip, power=None)
+    
+    def _handle_nmea_sentence(self, ip, packet):
+        parser = self.nmea_parsers.get(ip)
+        if parser is None:
+            # 기존처럼 체크섬(*hh)이 없는 문장도 받고, 체크섬이 틀린 문장만 버림
+            parser = self.nmea_parsers[ip] = NmeaParser(require_checksum=False)
+        
+        fix = parser.parse(packet)
+        if fix is None:
+            return
+        
+        self.nmea_message = packet.decode('ascii', errors='ignore').strip()
+        
+        if fix.kind == 'GGA' and fix.lat is not None:
+            self.gps_data[ip] = (fix.lng, fix.lat)
+            self.gps_fixes[ip] = fix
+            
+            if self.history:
+                alt = fix.alt if fix.alt is not None else float("nan")
+                self.history.append(ip, time.time(), fix.lng, fix.lat, alt, fix.quality)
+            
+            # quality: 0=No fix, 1=GPS, 2=DGPS, 4=RTK fixed, 5=RTK float
+            if fix.quality == 4:
+                rtk = 'fixed'
+            elif fix.quality == 5:
+                rtk = 'float'
+            else:
+                rtk = 'none'
+            
+            # 문장마다 출력하지 않고 상태가 바뀔 때만 출력
+            if self.rtk_status.get(ip) != rtk:
+                print(f"RTK {rtk.capitalize()}: {ip}, lng: {fix.lng}, lat: {fix.lat}")
+            self.rtk_status[ip] = rtk
+            self.state.update(ip, position=(fix.lng, fix.lat), fix=fix, fix_at=time.time(), rtk=rtk)
+    
+    # ---- SensorEventLoop 콜백 (루프 스레드에서 호출) ----
+    
+    def _on_channel_connected(self, ip, kind, sock):
+        print(f"{self._KIND_LABELS[kind]} socket connected: {ip}")
+        
+        self.reconnect.on_connected((ip, kind))
+        
+        if kind == "power":
+            self.power_sockets[ip] = sock
+            self._power_decoders[ip] = PowerFrameDecoder()
+        else:
+            self.gps_sockets[ip] = sock
+            self._gps_framers[ip] = NmeaFramer()
+            self.rtcm_fanout.attach(ip, sock)
+    
+    def _on_channel_closed(self, ip, kind, error):
+        if error is not None:
+            print(f"{self._KIND_LABELS[kind]} socket error ({ip}): {error}")
+        
+        self._connection_finished(ip, kind, error)
+        
+        if kind == "power":
+            self.power_sockets.pop(ip, None)
+            self._power_decoders.pop(ip, None)
+            self._set_power_lost(ip)
+        else:
+            self.gps_sockets.pop(ip, None)
+            self._gps_framers.pop(ip, None)
+            self.rtcm_fanout.detach(ip)
+    
+    def _on_channel_data(self, ip, kind, data):
+        if kind == "power":
+            decoder = self._power_decoders.get(ip)
+            if decoder is None:
+                decoder = self._power_decoders[ip] = PowerFrameDecoder()
+            
+            self._feed_power_data(ip, decoder, data)
+        else:
+            framer = self._gps_framers.get(ip)
+            if framer is None:
+                framer = self._gps_framers[ip] = NmeaFramer()
+            
+            for sentence in framer.feed(data):
+                self._handle_nmea_sentence(ip, sentence)
 
     def send_rtcm(self, rtcm_data):
-        for ip, sock in list(self.gps_sockets.items()):
-            try:
-                sock.send(rtcm_data)
-            except Exception as e:
-                print(f"Error sending RTCM to {ip}: {e}")
-
-    @staticmethod
-    def _nmea_to_decimal(raw):
-        raw_float = float(raw)
-        degrees = int(raw_float / 100)
-        minutes = raw_float - degrees * 100
-        return degrees + minutes / 60
+        """RTCM을 모든 GPS 소켓의 송신 큐에 넣고 바로 반환
+        
+        rtcm_data는 bytes 또는 프레임 목록이며, 큐가 넘치면 프레임 단위로 버린다.
+        bytes(rtcm_framing이 꺼진 원본 청크)인데 센서별 규칙이 있으면 규칙이 메시지 타입을
+        볼 수 있도록 먼저 프레임으로 나눈다 (CRC가 틀린 데이터는 버려짐).
+        """
+        if isinstance(rtcm_data, (bytes, bytearray, memoryview)):
+            if self.rtcm_fanout.filters:
+                if self._rtcm_framer is None:
+                    self._rtcm_framer = RtcmFramer(measure_latency=False)
+                rtcm_data = self._rtcm_framer.feed(rtcm_data)
+                if not rtcm_data:
+                    return
+            else:
+                rtcm_data = [bytes(rtcm_data) if isinstance(rtcm_data, bytearray) else rtcm_data]
+        self.rtcm_fanout.publish(rtcm_data)
@@ -0,0 +1,83 @@
+DEFAULT_POWER_PORT = 23
+DEFAULT_GPS_PORT = 24
+TRANSPORTS = ("tcp",)
+
+
+class SensorDescriptor:
+    """센서 접속 정보 (호스트, 전원/GPS 포트, 전송 방식)
+    
+    key는 센서를 구분하는 이름으로, 기존처럼 IP만 쓰거나 "host:power_port:gps_port"
+    형태로 써서 같은 게이트웨이 뒤의 여러 센서를 구분할 수 있다.
+    rtcm_filter는 이 센서로 보낼 RTCM 규칙 설정 dict (RtcmFilter.from_config 형식)이다.
+    """
+    __slots__ = ("key", "host", "power_port", "gps_port", "transport", "rtcm_filter")
+    
+    def __init__(self, key, host, power_port=DEFAULT_POWER_PORT, gps_port=DEFAULT_GPS_PORT,
+                 transport="tcp", rtcm_filter=None):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"unsupported sensor transport: {transport}")
+        
+        self.key = key
+        self.host = host
+        self.power_port = int(power_port)
+        self.gps_port = int(gps_port)
+        self.transport = transport
+        self.rtcm_filter = rtcm_filter
+    
+    def address(self, kind):
+        """kind("power"/"gps")에 해당하는 (host, port)"""
+        return (self.host, self.power_port if kind == "power" else self.gps_port)
+    
+    @classmethod
+    def parse(cls, key, power_port=DEFAULT_POWER_PORT, gps_port=DEFAULT_GPS_PORT):
+        """"host", "host:power_port" 또는 "host:power_port:gps_port" 문자열에서 생성
+        
+        GPS 포트를 생략하면 power_port + 1을 쓴다.
+        """
+        parts = key.strip().split(":")
+        if len(parts) > 3 or not parts[0]:
+            raise ValueError(f"invalid sensor address: {key}")
+        
+        host = parts[0]
+        if len(parts) >= 2:
+            power_port = int(parts[1])
+            gps_port = int(parts[2]) if len(parts) == 3 else power_port + 1
+        return cls(key, host, power_port, gps_port)
+    
+    @classmethod
+    def from_config(cls, key, value, power_port=DEFAULT_POWER_PORT, gps_port=DEFAULT_GPS_PORT):
+        """config.yaml sensors_ip 항목에서 (channel, descriptor) 생성
+        
+        값은 기존 형식의 채널 문자열("ch1")이거나
+        {channel, host, power_port, gps_port, transport, rtcm} dict 이다.
+        """
+        if not isinstance(value, dict):
+            return value, cls.parse(str(key), power_port, gps_port)
+        
+        base = cls.parse(str(key), power_port, gps_port)
+        descriptor = cls(
+            str(key),
+            value.get("host", base.host),
+            value.get("power_port", base.power_port),
+            value.get("gps_port", base.gps_port),
+            value.get("transport", "tcp"),
+            value.get("rtcm")
+        )
+        return value.get("channel"), descriptor
+    
+    def __repr__(self):
+        return (f"SensorDescriptor({self.key!r}, {self.host}, power={self.power_port}, "
+                f"gps={self.gps_port}, {self.transport})")
+
+
+def load_sensor_config(sensors_ip):
+    """sensors_ip 설정을 [(key, channel, SensorDescriptor), ...]로 변환, 잘못된 항목은 건너뜀"""
+    sensors = []
+    for key, value in (sensors_ip or {}).items():
+        try:
+            channel, descriptor = SensorDescriptor.from_config(key, value)
+        except (ValueError, TypeError) as e:
+            print(f"Invalid sensor config ({key}): {e}")
+            continue
+        sensors.append((str(key), channel or f"ch{len(sensors) + 1}", descriptor))
+    return sensors
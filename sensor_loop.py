@@ -0,0 +1,303 @@
+import errno
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+
+RESOLVE_TTL = 300.0  # 호스트 이름 조회 결과 보관 시간 (초)
+
+
+def _numeric_address(host, port):
+    """IP 주소 문자열이면 (family, sockaddr), 호스트 이름이면 None (DNS 조회 없음)"""
+    try:
+        info = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM, 0, socket.AI_NUMERICHOST)
+    except (socket.gaierror, UnicodeError):
+        return None
+    return info[0][0], info[0][4]
+
+
+class _Channel:
+    """센서 하나의 power 또는 gps 소켓 상태"""
+    __slots__ = ("ip", "kind", "sock", "connected", "deadline", "writing")
+    
+    def __init__(self, ip, kind, sock, deadline):
+        self.ip = ip
+        self.kind = kind
+        self.sock = sock
+        self.connected = False
+        self.deadline = deadline
+        self.writing = False  # EVENT_WRITE 등록 여부 (RTCM 송신 대기 중)
+
+
+class SensorEventLoop:
+    """모든 센서의 power(23) / GPS(24) 소켓을 하나의 스레드에서 selectors로 처리"""
+    
+    KINDS = ("power", "gps")
+    
+    def __init__(self, client, connect_timeout=5.0, recv_size=65536):
+        self.client = client
+        self.connect_timeout = connect_timeout
+        self.recv_size = recv_size
+        self.selector = selectors.DefaultSelector()
+        self.channels = {}  # {(ip, kind): _Channel}
+        self.commands = deque()
+        self.running = False
+        self._rtcm_flush_posted = False
+        self.thread = None
+        self._resolved = {}      # {(host, port): (family, sockaddr, 조회 시각)}
+        self._resolving = {}     # {(host, port): {(ip, kind), ...}} 보조 스레드에서 조회 중, 끝나면 연결할 채널
+        
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+    
+    def start(self):
+        if self.running:
+            return
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout=2.0):
+        self.running = False
+        self.wakeup()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+    
+    def close_sensor(self, ip):
+        self._post(self._close_sensor, ip)
+    
+    def call_soon(self, func, *args):
+        """루프 스레드에서 func(*args) 실행"""
+        self._post(func, *args)
+    
+    def schedule_rtcm_flush(self):
+        """RtcmFanout에 쌓인 데이터 전송 요청 (여러 번 호출돼도 한 번만 실행)"""
+        if not self._rtcm_flush_posted:
+            self._rtcm_flush_posted = True
+            self._post(self._flush_rtcm)
+    
+    def _post(self, func, *args):
+        self.commands.append((func, args))
+        self.wakeup()
+    
+    def wakeup(self):
+        try:
+            self._wakeup_w.send(b"\x00")
+        except (BlockingIOError, OSError):
+            pass
+    
+    def _run(self):
+        try:
+            while self.running:
+                events = self.selector.select(self._select_timeout())
+                
+                for key, mask in events:
+                    if key.data is None:
+                        self._drain_wakeup()
+                    else:
+                        self._handle_event(key.data, mask)
+                
+                self._process_commands()
+                self._check_connect_timeouts()
+                self._start_due_connects()
+        except Exception as e:
+            print(f"Sensor event loop error: {e}")
+        finally:
+            for channel in list(self.channels.values()):
+                self._close_channel(channel, None)
+            self.selector.close()
+            self._wakeup_r.close()
+            self._wakeup_w.close()
+    
+    def _select_timeout(self):
+        timeout = self.client.reconnect.next_timeout()
+        now = time.monotonic()
+        for channel in self.channels.values():
+            if not channel.connected:
+                timeout = min(timeout, max(0.0, channel.deadline - now))
+        return timeout
+    
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+    
+    def _process_commands(self):
+        while self.commands:
+            func, args = self.commands.popleft()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Sensor event loop command error: {e}")
+    
+    def _close_sensor(self, ip):
+        for kind in self.KINDS:
+            channel = self.channels.get((ip, kind))
+            if channel:
+                self._close_channel(channel, None)
+    
+    def _open_channel(self, ip, kind):
+        if ip not in self.client.sensors:
+            self.client.reconnect.remove((ip, kind))
+            return
+        if (ip, kind) in self.channels:
+            self.client.reconnect.release((ip, kind))
+            return
+        
+        host, port = self.client.sensor_address(ip, kind)
+        address = self._address(host, port)
+        if address is None:
+            # 호스트 이름은 조회가 막힐 수 있으므로 보조 스레드에서 조회하고 끝나면 다시 연결
+            self._resolve(ip, kind, host, port)
+            return
+        family, sockaddr = address
+        print(f"Connecting to {self.client._KIND_LABELS[kind]} socket: {host}:{port}")
+        
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        err = sock.connect_ex(sockaddr)
+        
+        channel = _Channel(ip, kind, sock, time.monotonic() + self.connect_timeout)
+        self.channels[(ip, kind)] = channel
+        
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+            self._close_channel(channel, OSError(err, os.strerror(err)))
+            return
+        
+        self.selector.register(sock, selectors.EVENT_WRITE, channel)
+    
+    def _address(self, host, port):
+        address = _numeric_address(host, port)
+        if address is not None:
+            return address
+        
+        cached = self._resolved.get((host, port))
+        if cached is None or time.monotonic() - cached[2] > RESOLVE_TTL:
+            return None
+        return cached[0], cached[1]
+    
+    def _resolve(self, ip, kind, host, port):
+        waiters = self._resolving.get((host, port))
+        if waiters is not None:
+            # 같은 주소를 조회 중이면 결과가 오면 이 연결도 같이 시도
+            waiters.add((ip, kind))
+            return
+        self._resolving[(host, port)] = {(ip, kind)}
+        threading.Thread(target=self._resolve_worker, args=(host, port), daemon=True).start()
+    
+    def _resolve_worker(self, host, port):
+        try:
+            info = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+            result, error = (info[0][0], info[0][4]), None
+        except (OSError, UnicodeError) as e:
+            result, error = None, e
+        self._post(self._on_resolved, host, port, result, error)
+    
+    def _on_resolved(self, host, port, address, error):
+        waiters = self._resolving.pop((host, port), ())
+        if address is not None:
+            self._resolved[(host, port)] = (address[0], address[1], time.monotonic())
+        
+        for ip, kind in waiters:
+            if address is not None:
+                self._open_channel(ip, kind)
+            elif ip in self.client.sensors:
+                # 연결 실패와 같이 처리 (백오프 후 재시도)
+                self.client._on_channel_closed(ip, kind, OSError(f"cannot resolve {host}: {error}"))
+            else:
+                self.client.reconnect.remove((ip, kind))
+    
+    def _close_channel(self, channel, error):
+        if self.channels.get((channel.ip, channel.kind)) is not channel:
+            return
+        
+        del self.channels[(channel.ip, channel.kind)]
+        
+        try:
+            self.selector.unregister(channel.sock)
+        except (KeyError, ValueError):
+            pass
+        
+        try:
+            channel.sock.close()
+        except:
+            pass
+        
+        self.client._on_channel_closed(channel.ip, channel.kind, error)
+    
+    def _handle_event(self, channel, mask):
+        if not channel.connected:
+            if mask & selectors.EVENT_WRITE:
+                self._finish_connect(channel)
+            return
+        
+        if mask & selectors.EVENT_WRITE:
+            self._write_rtcm(channel)
+            if self.channels.get((channel.ip, channel.kind)) is not channel:
+                return
+        
+        if mask & selectors.EVENT_READ:
+            try:
+                data = channel.sock.recv(self.recv_size)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                self._close_channel(channel, e)
+                return
+            
+            if not data:
+                print(f"{self.client._KIND_LABELS[channel.kind]} socket closed: {channel.ip}")
+                self._close_channel(channel, None)
+                return
+            
+            self.client._on_channel_data(channel.ip, channel.kind, data)
+    
+    def _flush_rtcm(self):
+        self._rtcm_flush_posted = False
+        for ip in self.client.rtcm_fanout.pending_ips():
+            channel = self.channels.get((ip, "gps"))
+            if channel and channel.connected:
+                self._write_rtcm(channel)
+    
+    def _write_rtcm(self, channel):
+        """남은 RTCM을 보낼 수 있는 만큼 보내고, 남으면 EVENT_WRITE로 이어서 전송"""
+        try:
+            done = self.client.rtcm_fanout.write(channel.ip)
+        except OSError as e:
+            self._close_channel(channel, e)
+            return
+        
+        if channel.writing == done:
+            channel.writing = not done
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if channel.writing else 0)
+            self.selector.modify(channel.sock, events, channel)
+    
+    def _finish_connect(self, channel):
+        err = channel.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err:
+            self._close_channel(channel, OSError(err, os.strerror(err)))
+            return
+        
+        channel.connected = True
+        self.selector.modify(channel.sock, selectors.EVENT_READ, channel)
+        self.client._on_channel_connected(channel.ip, channel.kind, channel.sock)
+    
+    def _check_connect_timeouts(self):
+        now = time.monotonic()
+        for channel in list(self.channels.values()):
+            if not channel.connected and now >= channel.deadline:
+                self._close_channel(channel, socket.timeout("connect timeout"))
+    
+    def _start_due_connects(self):
+        if not self.running:
+            return
+        for ip, kind in self.client.reconnect.due():
+            self._open_channel(ip, kind)
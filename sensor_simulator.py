@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import datetime
+import math
+import random
+import threading
+import time
+
+import yaml
+
+from nmea_parser import nmea_checksum
+
+
+METERS_PER_DEG = 111320.0
+
+
+def nmea_sentence(body):
+    """'GPGGA,...' 본문에 '$', 체크섬, CRLF를 붙여 bytes로 반환"""
+    data = body.encode("ascii")
+    return b"$" + data + b"*%02X\r\n" % nmea_checksum(data)
+
+
+def _nmea_coord(value, width):
+    value = abs(value)
+    degrees = int(value)
+    minutes = round((value - degrees) * 60, 5)
+    if minutes >= 60.0:
+        # 반올림으로 60분이 되면 도로 올림 ("3760.00000" 방지)
+        degrees += 1
+        minutes = 0.0
+    return f"{degrees:0{width}d}{minutes:08.5f}"
+
+
+class SimulatorFaults:
+    """장애 주입 설정 (확률은 문장/패킷 하나당, disconnect_rate는 연결당 초당 횟수)"""
+    __slots__ = ("disconnect_rate", "garbage", "split", "bad_checksum")
+    
+    def __init__(self, disconnect_rate=0.0, garbage=0.0, split=0.0, bad_checksum=0.0):
+        self.disconnect_rate = disconnect_rate
+        self.garbage = garbage
+        self.split = split
+        self.bad_checksum = bad_checksum
+
+
+class VirtualSensor:
+    """원 궤도를 따라 움직이며 GGA/RMC와 전원 패킷을 보내는 가상 센서"""
+    
+    def __init__(self, index, host, power_port, gps_port, center, radius=20.0,
+                 speed=1.5, quality=4, rng=None, time_decimals=2):
+        self.index = index
+        self.host = host
+        self.power_port = power_port
+        self.gps_port = gps_port
+        self.quality = quality
+        self.time_decimals = time_decimals
+        self.rng = rng or random.Random(index)
+        
+        # 센서마다 궤도 중심을 격자로 떨어뜨려 겹치지 않게 배치 (0번은 center)
+        center_lat, center_lng = center
+        row, col = divmod(index, 32)
+        north = row * radius * 2.5
+        east = col * radius * 2.5
+        self.center_lat = center_lat + north / METERS_PER_DEG
+        self.center_lng = center_lng + east / (METERS_PER_DEG * math.cos(math.radians(center_lat)))
+        self.radius = radius
+        self.speed = speed
+        self.phase = self.rng.uniform(0, 2 * math.pi)
+        self.alt = 45.0 + self.rng.uniform(-5, 5)
+        
+        self.power = False
+        self.connections = 0
+        self.sentences = 0
+        self.power_frames = 0
+        self.bytes_sent = 0
+        self.faults_injected = 0
+    
+    def position(self, t):
+        """(lat, lng, speed m/s, course deg)"""
+        omega = self.speed / self.radius if self.radius else 0.0
+        angle = self.phase + omega * t
+        north = self.radius * math.sin(angle)
+        east = self.radius * math.cos(angle)
+        
+        lat = self.center_lat + north / METERS_PER_DEG
+        lng = self.center_lng + east / (METERS_PER_DEG * math.cos(math.radians(self.center_lat)))
+        course = math.degrees(math.atan2(-math.sin(angle), math.cos(angle))) % 360.0
+        return lat, lng, self.speed, course
+    
+    def sentences_at(self, t):
+        lat, lng, speed, course = self.position(t)
+        utc = datetime.datetime.fromtimestamp(t, datetime.timezone.utc)
+        scale = 10 ** self.time_decimals
+        seconds = utc.second + (utc.microsecond * scale // 1000000) / scale
+        width = 3 + self.time_decimals if self.time_decimals else 2
+        hms = utc.strftime("%H%M") + f"{seconds:0{width}.{self.time_decimals}f}"
+        lat_s = _nmea_coord(lat, 2)
+        lng_s = _nmea_coord(lng, 3)
+        ns = "N" if lat >= 0 else "S"
+        ew = "E" if lng >= 0 else "W"
+        age = "1.0" if self.quality in (4, 5) else ""
+        station = "0000" if self.quality in (4, 5) else ""
+        
+        gga = (f"GPGGA,{hms},{lat_s},{ns},{lng_s},{ew},{self.quality},12,0.8,"
+               f"{self.alt:.1f},M,19.6,M,{age},{station}")
+        rmc = (f"GPRMC,{hms},A,{lat_s},{ns},{lng_s},{ew},{speed / 0.514444:.2f},"
+               f"{course:.1f},{utc.strftime('%d%m%y')},,,D")
+        return nmea_sentence(gga), nmea_sentence(rmc)
+    
+    def power_frame(self):
+        return b'\x02' + (b'01' if self.power else b'00') + b'\x03\r\n'
+
+
+class SensorSimulator:
+    """N개의 가상 센서를 하나의 asyncio 루프에서 실행
+    
+    loopback_aliases=True면 센서마다 127.0.0.x 주소를 쓰고 포트는 power_port/gps_port로 같으며,
+    False면 host 하나에서 센서마다 port_step씩 포트를 늘려 배치한다.
+    """
+    
+    def __init__(self, count=1, host="127.0.0.1", loopback_aliases=False,
+                 power_port=23, gps_port=24, port_step=2, rate=1.0,
+                 power_period=1.0, center=(37.337156, 126.714823), radius=20.0,
+                 speed=1.5, quality=4, faults=None, greeting=b"", seed=None, verbose=False,
+                 time_decimals=2):
+        if not 0 < rate <= 50:
+            raise ValueError("rate must be between 0 and 50 Hz")
+        
+        self.rate = rate
+        self.power_period = power_period
+        self.faults = faults or SimulatorFaults()
+        self.greeting = greeting
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        
+        self.sensors = []
+        for i in range(count):
+            if loopback_aliases:
+                sensor_host = self._alias(host, i)
+                ports = (power_port, gps_port)
+            else:
+                sensor_host = host
+                ports = (power_port + i * port_step, gps_port + i * port_step)
+            
+            self.sensors.append(VirtualSensor(
+                i, sensor_host, ports[0], ports[1], center,
+                radius=radius, speed=speed, quality=quality,
+                rng=random.Random(self.rng.random()), time_decimals=time_decimals
+            ))
+        
+        self.loop = None
+        self.thread = None
+        self._servers = []
+        self._tasks = set()
+        self._stop_event = None
+        self._ready = threading.Event()
+        self._error = None
+    
+    @staticmethod
+    def _alias(host, index):
+        base = [int(part) for part in host.split(".")]
+        value = (base[1] << 16 | base[2] << 8 | base[3]) + index
+        return f"{base[0]}.{(value >> 16) & 0xFF}.{(value >> 8) & 0xFF}.{value & 0xFF}"
+    
+    # ---- 실행 제어 ----
+    
+    def start(self):
+        """백그라운드 스레드에서 시작하고 모든 포트가 열릴 때까지 대기"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+    
+    def stop(self, timeout=5.0):
+        if self.loop and self._stop_event:
+            self.loop.call_soon_threadsafe(self._stop_event.set)
+        if self.thread:
+            self.thread.join(timeout=timeout)
+    
+    def run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+    
+    def sensor_descriptors(self):
+        """[(host, power_port, gps_port), ...]"""
+        return [(s.host, s.power_port, s.gps_port) for s in self.sensors]
+    
+    def sensor_config(self):
+        """config.yaml sensors_ip 형식 {"host:power_port:gps_port": channel}"""
+        return {
+            f"{s.host}:{s.power_port}:{s.gps_port}": f"ch{s.index + 1}"
+            for s in self.sensors
+        }
+    
+    def stats(self):
+        return {
+            "sensors": len(self.sensors),
+            "connections": sum(s.connections for s in self.sensors),
+            "sentences": sum(s.sentences for s in self.sensors),
+            "power_frames": sum(s.power_frames for s in self.sensors),
+            "bytes_sent": sum(s.bytes_sent for s in self.sensors),
+            "faults_injected": sum(s.faults_injected for s in self.sensors),
+        }
+    
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        
+        try:
+            for sensor in self.sensors:
+                self._servers.append(await asyncio.start_server(
+                    lambda r, w, s=sensor: self._serve(s, r, w, self._power_stream),
+                    sensor.host, sensor.power_port, reuse_address=True
+                ))
+                self._servers.append(await asyncio.start_server(
+                    lambda r, w, s=sensor: self._serve(s, r, w, self._gps_stream),
+                    sensor.host, sensor.gps_port, reuse_address=True
+                ))
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            for server in self._servers:
+                server.close()
+            return
+        
+        self._ready.set()
+        await self._stop_event.wait()
+        
+        for server in self._servers:
+            server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    # ---- 연결 처리 ----
+    
+    async def _serve(self, sensor, reader, writer, stream):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        sensor.connections += 1
+        if self.verbose:
+            print(f"[sensor {sensor.index}] connected: {writer.get_extra_info('peername')}")
+        
+        try:
+            if self.greeting:
+                writer.write(self.greeting)
+            await stream(sensor, writer)
+        except (ConnectionError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._tasks.discard(task)
+    
+    async def _power_stream(self, sensor, writer):
+        while not self._stop_event.is_set():
+            await self._send(sensor, writer, sensor.power_frame(), checksum=False)
+            sensor.power_frames += 1
+            sensor.power = not sensor.power
+            
+            if self._should_disconnect(self.power_period):
+                sensor.faults_injected += 1
+                return
+            await asyncio.sleep(self.power_period)
+    
+    async def _gps_stream(self, sensor, writer):
+        interval = 1.0 / self.rate
+        next_time = self.loop.time()
+        
+        while not self._stop_event.is_set():
+            for sentence in sensor.sentences_at(time.time()):
+                await self._send(sensor, writer, sentence)
+                sensor.sentences += 1
+            
+            if self._should_disconnect(interval):
+                sensor.faults_injected += 1
+                return
+            
+            next_time += interval
+            await asyncio.sleep(max(0.0, next_time - self.loop.time()))
+    
+    def _should_disconnect(self, interval):
+        rate = self.faults.disconnect_rate
+        return rate > 0 and self.rng.random() < rate * interval
+    
+    async def _send(self, sensor, writer, data, checksum=True):
+        faults = self.faults
+        rng = self.rng
+        
+        if checksum and faults.bad_checksum and rng.random() < faults.bad_checksum:
+            # 체크섬 마지막 자리를 다른 값으로 변경
+            digit = data[-3:-2]
+            data = data[:-3] + (b"0" if digit != b"0" else b"1") + data[-2:]
+            sensor.faults_injected += 1
+        
+        if faults.garbage and rng.random() < faults.garbage:
+            junk = bytes(rng.randrange(256) for _ in range(rng.randint(1, 16)))
+            writer.write(junk.replace(b"$", b"#").replace(b"\x02", b"\x01"))
+            sensor.faults_injected += 1
+        
+        if faults.split and len(data) > 1 and rng.random() < faults.split:
+            cut = rng.randint(1, len(data) - 1)
+            writer.write(data[:cut])
+            await writer.drain()
+            await asyncio.sleep(0.005)
+            writer.write(data[cut:])
+            sensor.faults_injected += 1
+        else:
+            writer.write(data)
+        
+        sensor.bytes_sent += len(data)
+        await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Virtual power/GPS sensor simulator")
+    parser.add_argument("--count", type=int, default=1, help="number of virtual sensors")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--aliases", action="store_true",
+                        help="one loopback address per sensor (127.0.0.1, 127.0.0.2, ...) on the same ports")
+    parser.add_argument("--power-port", type=int, default=23)
+    parser.add_argument("--gps-port", type=int, default=24)
+    parser.add_argument("--port-step", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=1.0, help="GGA/RMC output rate (1-50 Hz)")
+    parser.add_argument("--power-period", type=float, default=1.0, help="power frame toggle period (s)")
+    parser.add_argument("--center", type=float, nargs=2, default=(37.337156, 126.714823),
+                        metavar=("LAT", "LNG"))
+    parser.add_argument("--radius", type=float, default=20.0, help="track radius (m)")
+    parser.add_argument("--speed", type=float, default=1.5, help="track speed (m/s)")
+    parser.add_argument("--quality", type=int, default=4, help="GGA fix quality")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="disconnects per second per connection")
+    parser.add_argument("--garbage", type=float, default=0.0, help="garbage bytes probability per write")
+    parser.add_argument("--split", type=float, default=0.0, help="split frame probability per write")
+    parser.add_argument("--bad-checksum", type=float, default=0.0, help="bad checksum probability per sentence")
+    parser.add_argument("--time-decimals", type=int, default=2, help="decimals of the NMEA UTC time field")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("--stats-interval", type=float, default=5.0)
+    parser.add_argument("--write-config", default=None, metavar="PATH",
+                        help="write a sensors_ip YAML block for these sensors")
+    args = parser.parse_args(argv)
+    
+    simulator = SensorSimulator(
+        count=args.count,
+        host=args.host,
+        loopback_aliases=args.aliases,
+        power_port=args.power_port,
+        gps_port=args.gps_port,
+        port_step=args.port_step,
+        rate=args.rate,
+        power_period=args.power_period,
+        center=tuple(args.center),
+        radius=args.radius,
+        speed=args.speed,
+        quality=args.quality,
+        faults=SimulatorFaults(
+            disconnect_rate=args.disconnect_rate,
+            garbage=args.garbage,
+            split=args.split,
+            bad_checksum=args.bad_checksum
+        ),
+        seed=args.seed,
+        verbose=not args.quiet,
+        time_decimals=args.time_decimals
+    )
+    simulator.start()
+    print(f"Simulator ready: {len(simulator.sensors)} sensors", flush=True)
+    
+    if args.write_config:
+        with open(args.write_config, "w", encoding="utf-8") as f:
+            yaml.dump({"sensors_ip": simulator.sensor_config()}, f, default_flow_style=False)
+        print(f"Sensor config written to {args.write_config}")
+    
+    for host, power_port, gps_port in simulator.sensor_descriptors()[:10]:
+        print(f"sensor {host}  power:{power_port}  gps:{gps_port}")
+    if len(simulator.sensors) > 10:
+        print(f"... {len(simulator.sensors) - 10} more")
+    
+    try:
+        while True:
+            time.sleep(args.stats_interval)
+            if not args.quiet:
+                print(simulator.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
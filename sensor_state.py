@@ -0,0 +1,147 @@
+import threading
+import time
+
+
+class SensorRecord:
+    """센서 하나의 상태, 저장소 밖에서는 변경하지 않는다 (갱신 시 새 레코드로 교체)"""
+    __slots__ = (
+        "ip", "channel", "power", "power_changed_at",
+        "position", "fix", "fix_at", "rtk", "version", "updated_at"
+    )
+    
+    def __init__(self, ip, channel, version):
+        self.ip = ip
+        self.channel = channel
+        self.power = None             # None=연결 안 됨, True/False=감지 여부
+        self.power_changed_at = None
+        self.position = None          # (lng, lat)
+        self.fix = None               # 마지막 GGA NmeaFix
+        self.fix_at = None            # fix를 받은 시각 (updated_at은 전원 상태로도 바뀜)
+        self.rtk = None               # 'fixed', 'float', 'none'
+        self.version = version
+        self.updated_at = time.time()
+    
+    def _replace(self, version, fields):
+        record = SensorRecord.__new__(SensorRecord)
+        for name in self.__slots__:
+            setattr(record, name, fields.get(name, getattr(self, name)))
+        record.version = version
+        record.updated_at = time.time()
+        return record
+    
+    def __repr__(self):
+        return (f"SensorRecord({self.ip}, {self.channel}, power={self.power}, "
+                f"position={self.position}, rtk={self.rtk}, version={self.version})")
+
+
+class SensorStateStore:
+    """센서 상태 저장소
+    
+    모든 쓰기는 락 안에서 버전을 1씩 올리고, snapshot()은 복사 없이 현재 dict를
+    넘겨준 뒤 다음 쓰기 때 한 번만 복사한다(copy-on-write). UI는 changed_since()로
+    마지막으로 본 버전 이후 바뀐 센서만 받아 갱신할 수 있다.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}   # {ip: SensorRecord}, 갱신 순서(=버전 순서)로 유지
+        self._shared = False
+        self._removed = {}   # {ip: 삭제된 버전}
+        self._version = 0
+        self._listeners = []
+    
+    @property
+    def version(self):
+        return self._version
+    
+    def subscribe(self, callback):
+        """callback(ip, record) 등록, 삭제 시 record는 None (쓰는 스레드에서 호출)"""
+        self._listeners.append(callback)
+    
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def add(self, ip, channel):
+        with self._lock:
+            records = self._writable()
+            self._version += 1
+            current = records.pop(ip, None)
+            if current is None:
+                record = SensorRecord(ip, channel, self._version)
+            else:
+                record = current._replace(self._version, {"channel": channel})
+            records[ip] = record
+            self._removed.pop(ip, None)
+        
+        self._notify(ip, record)
+        return record
+    
+    def remove(self, ip):
+        with self._lock:
+            if ip not in self._records:
+                return
+            records = self._writable()
+            self._version += 1
+            del records[ip]
+            self._removed[ip] = self._version
+        
+        self._notify(ip, None)
+    
+    def update(self, ip, **fields):
+        """센서 필드 갱신, 값이 그대로면 버전을 올리지 않는다"""
+        with self._lock:
+            current = self._records.get(ip)
+            if current is None:
+                return None
+            if all(getattr(current, name) == value for name, value in fields.items()):
+                return current
+            
+            records = self._writable()
+            self._version += 1
+            record = current._replace(self._version, fields)
+            # 버전 순서를 유지하기 위해 맨 뒤로 이동
+            del records[ip]
+            records[ip] = record
+        
+        self._notify(ip, record)
+        return record
+    
+    def get(self, ip):
+        return self._records.get(ip)
+    
+    def snapshot(self):
+        """(version, {ip: SensorRecord}) 반환, 반환된 dict는 이후 변경되지 않는다"""
+        with self._lock:
+            self._shared = True
+            return self._version, self._records
+    
+    def changed_since(self, version):
+        """(현재 버전, {ip: 바뀐 레코드}, [삭제된 ip]) 반환"""
+        with self._lock:
+            self._shared = True
+            records = self._records
+            current = self._version
+            removed = [ip for ip, v in self._removed.items() if v > version]
+        
+        changed = {}
+        for ip in reversed(records):
+            record = records[ip]
+            if record.version <= version:
+                break
+            changed[ip] = record
+        
+        return current, changed, removed
+    
+    def _writable(self):
+        if self._shared:
+            self._records = dict(self._records)
+            self._shared = False
+        return self._records
+    
+    def _notify(self, ip, record):
+        for callback in list(self._listeners):
+            try:
+                callback(ip, record)
+            except Exception as e:
+                print(f"Sensor state listener error: {e}")
@@ -1,19 +1,156 @@
+import math
 import requests
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from io import BytesIO
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor
 from PyQt5.QtWidgets import QLabel
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QBuffer
 from urllib.parse import quote
 
+from map_tiles import lnglat_to_pixel, pixel_to_lnglat
+
 
 URL = "https://maps.apigw.ntruss.com/map-static/v2/raster"
+MAX_IMAGE_SIZE = 1024  # Static Map API 한 변 최대 픽셀
+
+
+class MapImageCache:
+    """화면(중심, 레벨, 크기, 지도 종류)별 지도 이미지 LRU 캐시
+
+    중심 좌표는 해당 레벨의 1픽셀 단위로 맞춰 키를 만들므로 같은 곳으로 돌아오면 적중한다.
+    응답 원본(PNG 등)과 함께 keep_decoded=True면 디코딩한 QImage도 보관하고,
+    보관한 바이트 합이 max_bytes를 넘으면 가장 오래 안 쓴 항목부터 버린다.
+    작업 스레드에서 같이 쓰므로 lock으로 보호한다.
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024, keep_decoded=True):
+        self.max_bytes = max_bytes
+        self.keep_decoded = keep_decoded
+        self.entries = OrderedDict()  # {key: [encoded, QImage 또는 None, 크기]}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(params):
+        level = int(params.get("level", 10))
+        # 중심을 해당 레벨의 Web Mercator 픽셀 좌표로 바꿔 1픽셀 단위로 양자화
+        lng, lat = map(float, str(params["center"]).split(","))
+        x, y = lnglat_to_pixel(lng, lat, level)
+        return (
+            round(x), round(y), level,
+            int(params.get("w", 0)), int(params.get("h", 0)), params.get("maptype", "basic"),
+            tuple(params.get("markers") or ())
+        )
+
+    def get(self, params):
+        """캐시된 QImage, 없으면 None"""
+        key = self.key(params)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            encoded, image = entry[0], entry[1]
+
+        if image is not None:
+            return image
+        return pil2qimage(Image.open(BytesIO(encoded)))
+
+    def put(self, params, encoded, image=None):
+        if not self.keep_decoded:
+            image = None
+        size = len(encoded) + (image.sizeInBytes() if image is not None else 0)
+        if size > self.max_bytes:
+            return
+
+        key = self.key(params)
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self.entries[key] = [encoded, image, size]
+            self.bytes += size
+
+            while self.bytes > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted[2]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+def pil2qimage(im):
+    im = im.convert("RGBA")
+    data = im.tobytes("raw", "RGBA")
+    # data 버퍼를 참조하지 않도록 복사 (스레드 간 전달 시 버퍼가 먼저 해제될 수 있음)
+    return QImage(data, im.width, im.height, QImage.Format_RGBA8888).copy()
+
+
+def split_view(params, max_size=MAX_IMAGE_SIZE):
+    """max_size보다 큰 화면을 같은 크기 조각 [(조각 params, 화면 x, 화면 y), ...]으로 나눔
+
+    조각 크기는 짝수로 맞춰 중심이 픽셀 경계에 오게 하고, 마지막 조각이 화면 밖으로 나가는 부분은
+    합칠 때 잘린다. 조각 중심은 Web Mercator 픽셀 좌표로 계산하므로 이어 붙여도 어긋나지 않는다.
+    """
+    w, h = int(params["w"]), int(params["h"])
+    level = int(params["level"])
+    nx, ny = math.ceil(w / max_size), math.ceil(h / max_size)
+    pw = min(max_size, math.ceil(w / nx / 2) * 2)
+    ph = min(max_size, math.ceil(h / ny / 2) * 2)
+
+    lng, lat = map(float, str(params["center"]).split(","))
+    cx, cy = lnglat_to_pixel(lng, lat, level)
+    ox, oy = cx - w / 2, cy - h / 2
+
+    pieces = []
+    for j in range(ny):
+        for i in range(nx):
+            x, y = i * pw, j * ph
+            p_lng, p_lat = pixel_to_lnglat(ox + x + pw / 2, oy + y + ph / 2, level)
+            piece = dict(params, center=f"{p_lng:.7f},{p_lat:.7f}", w=pw, h=ph)
+            pieces.append((piece, x, y))
+    return pieces
 
 
 class StaticMap:
-    def __init__(self):
+    def __init__(self, cache_bytes=128 * 1024 * 1024, cache_decoded=True, disk_cache=None, offline=False,
+                 mosaic_workers=4):
         self.client_id = None
         self.client_key = None
+        # 연결을 재사용하도록 세션 하나를 공유 (작업 스레드 + 조각 요청 스레드)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=mosaic_workers + 4)
+        self.session.mount("https://", adapter)
+        # API 최대 크기보다 큰 화면은 조각으로 나눠 동시에 받아 합침
+        self.mosaic = ThreadPoolExecutor(max_workers=mosaic_workers, thread_name_prefix="mosaic")
+        # cache_bytes=0이면 캐시 없이 매번 요청
+        self.cache = MapImageCache(cache_bytes, cache_decoded) if cache_bytes else None
+        # 재시작/오프라인용 영구 캐시 (MapDiskCache), offline=True면 API를 호출하지 않음
+        self.disk_cache = disk_cache
+        self.offline = offline
 
         self.params = {
             "center": "127.1054328,37.3595963",
@@ -63,50 +200,171 @@ class StaticMap:
             del self.params["markers"]
 
 
+    def snapshotParams(self):
+        """현재 요청 파라미터 복사본 (다른 스레드에서 요청할 때 사용)"""
+        params = dict(self.params)
+        if "markers" in params:
+            params["markers"] = list(params["markers"])
+        return params
+
     def getMapImage(self):
-        self.headers = {
+        return QPixmap.fromImage(self.getMapQImage())
+
+    def getMapQImage(self, params=None, fallback=True):
+        """지도 이미지를 QImage로 반환, QPixmap을 쓰지 않으므로 작업 스레드에서 호출 가능
+
+        API를 쓸 수 없으면 디스크 캐시의 (만료된) 같은 화면이나 가장 가까운 화면을 대신 쓴다.
+        가까운 화면으로 대체한 경우 params의 center/level을 그 이미지 기준으로 바꾼다.
+        fallback=False면 (타일처럼 위치가 고정된 경우) 다른 화면이나 회색 이미지 대신 None을 반환한다.
+        """
+        if params is None:
+            params = self.params
+
+        if int(params.get("w", 0)) > MAX_IMAGE_SIZE or int(params.get("h", 0)) > MAX_IMAGE_SIZE:
+            return self._get_mosaic(params, fallback)
+
+        if self.cache:
+            image = self.cache.get(params)
+            if image is not None:
+                return image
+
+        cached = self.disk_cache.get(params) if self.disk_cache else None
+        if cached and (cached[1] or self.offline):
+            return self._decode(params, cached[0], remember=cached[1])
+        if self.offline:
+            return self._fallback(params, cached, "Offline", fallback)
+
+        headers = {
             "X-NCP-APIGW-API-KEY-ID": self.client_id,
             "X-NCP-APIGW-API-KEY": self.client_key
         }
+        if cached and cached[2]:
+            # 만료된 이미지는 바뀌지 않았으면 304만 받도록 재검증
+            headers["If-None-Match"] = cached[2]
 
         try:
-            res = requests.get(URL, headers=self.headers, params=self.params, timeout=10)
+            res = self.session.get(URL, headers=headers, params=params, timeout=10)
+            
+            if res.status_code == 304 and cached:
+                self.disk_cache.touch(params)
+                return self._decode(params, cached[0])
             
             # 응답 상태 확인
             if res.status_code != 200:
                 print(f"Map API Error: {res.status_code}")
                 print(f"Response: {res.text}")
-                return self._create_error_pixmap(f"API Error: {res.status_code}")
+                return self._fallback(params, cached, f"API Error: {res.status_code}", fallback)
             
             # 이미지 파싱
-            img = Image.open(BytesIO(res.content))
-            pix = self.pil2pixmap(img)
-            return pix
+            image = self._decode(params, res.content)
+            if self.disk_cache:
+                self.disk_cache.put(params, res.content, res.headers.get("ETag"))
+            return image
             
         except requests.exceptions.Timeout:
             print("Map API request timeout")
-            return self._create_error_pixmap("Request Timeout")
+            return self._fallback(params, cached, "Request Timeout", fallback)
         except requests.exceptions.RequestException as e:
             print(f"Map API request error: {e}")
-            return self._create_error_pixmap(f"Request Error: {str(e)}")
+            return self._fallback(params, cached, f"Request Error: {str(e)}", fallback)
         except Exception as e:
             print(f"Map image error: {e}")
-            return self._create_error_pixmap(f"Error: {str(e)}")
+            return self._fallback(params, cached, f"Error: {str(e)}", fallback)
     
-    def _create_error_pixmap(self, message):
+    def _get_mosaic(self, params, fallback=True):
+        """큰 화면을 조각으로 나눠 동시에 받아 한 장으로 합침
+        
+        조각은 각각 getMapQImage로 받으므로 메모리/디스크 캐시에 조각 단위로 남는다.
+        실패한 조각 자리는 회색으로 두고, 모든 조각이 실패하면 화면 전체를 _fallback으로 대체한다.
+        모든 조각을 받은 화면은 디스크 캐시에도 한 장으로 남겨 오프라인 때 가까운 화면 대체에 쓴다.
+        """
+        pieces = split_view(params)
+        futures = [self.mosaic.submit(self.getMapQImage, piece, False) for piece, _, _ in pieces]
+        
+        image = QImage(int(params["w"]), int(params["h"]), QImage.Format_RGB32)
+        image.fill(QColor(200, 200, 200))
+        painter = QPainter(image)
+        failed = 0
+        for (piece, x, y), future in zip(pieces, futures):
+            try:
+                tile = future.result()
+            except Exception as e:
+                print(f"Map piece error: {e}")
+                tile = None
+            if tile is None:
+                failed += 1
+                continue
+            painter.drawImage(x, y, tile)
+        painter.end()
+        
+        if failed == len(pieces):
+            print("Map mosaic: all pieces failed")
+            return self._fallback(params, None, "Mosaic failed", fallback)
+        if failed:
+            print(f"Map mosaic: {failed}/{len(pieces)} pieces failed")
+        elif self.disk_cache and not self.offline:
+            self._store_mosaic(params, image)
+        return image
+    
+    def _store_mosaic(self, params, image):
+        try:
+            if self.disk_cache.has(params):
+                return
+            buffer = QBuffer()
+            buffer.open(QBuffer.WriteOnly)
+            image.save(buffer, "PNG")
+            self.disk_cache.put(params, bytes(buffer.data()))
+        except Exception as e:
+            print(f"Map cache error: {e}")
+    
+    def close(self):
+        self.mosaic.shutdown(wait=False)
+        self.session.close()
+        if self.disk_cache:
+            self.disk_cache.close()
+    
+    def _decode(self, params, data, remember=True):
+        image = pil2qimage(Image.open(BytesIO(data)))
+        if remember and self.cache:
+            self.cache.put(params, data, image)
+        return image
+    
+    def _fallback(self, params, cached, message, substitute=True):
+        """API 실패 시 만료된 같은 화면 -> 가장 가까운 캐시 화면 -> 회색 이미지 순으로 대체"""
+        try:
+            if cached:
+                return self._decode(params, cached[0], remember=False)
+            if not substitute:
+                return None
+            
+            nearest = self.disk_cache.nearest(params) if self.disk_cache else None
+            if nearest:
+                data, center, level = nearest
+                print(f"Map offline: using cached view at {center} (level {level})")
+                params["center"] = center
+                params["level"] = level
+                return self._decode(params, data, remember=False)
+        except Exception as e:
+            print(f"Map cache error: {e}")
+            if not substitute:
+                return None
+        
+        return self._create_error_image(params, message)
+    
+    def _create_error_image(self, params, message):
         """에러 발생 시 표시할 기본 이미지 생성"""
-        width = self.params.get("w", 800)
-        height = self.params.get("h", 600)
+        width = params.get("w", 800)
+        height = params.get("h", 600)
         
         img = Image.new('RGB', (width, height), color=(200, 200, 200))
         
-        return self.pil2pixmap(img)
+        return pil2qimage(img)
+    
+    def _create_error_pixmap(self, message):
+        return QPixmap.fromImage(self._create_error_image(self.params, message))
     
     def pil2pixmap(self,im):
-        im = im.convert("RGBA")
-        data = im.tobytes("raw", "RGBA")
-        qimage = QImage(data, im.width, im.height, QImage.Format_RGBA8888)
-        return QPixmap.fromImage(qimage)
+        return QPixmap.fromImage(pil2qimage(im))
     
     def update_markers(self, sensors, gps_data, power_status):
         self.clearMarkers()